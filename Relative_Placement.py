@@ -16,8 +16,11 @@ Couple Number || J1 | J2 | J3 | J4 | J5 || 1-1 | 1-2 | 1-3 | 1-4 | 1-5 | 1-6 ||
      6        ||   3|   3|   6|   4|   1||    1|    1|    3|-----|-----|---->||     2
 '''
 
+from score_sheet import ScoreSheet
+
 class Relative_Placements:
 	def __init__(self, places, headjudge, majority, include=False):
+		if isinstance(places, ScoreSheet): places = places.to_dict()
 		self.relative_placements = dict()
 		self.majority_placements = dict()
 		self.final_placements    = dict()
@@ -31,43 +34,51 @@ class Relative_Placements:
 		self.__cathunk(self.relative_placements.copy(), 1, 1)
 	
 	# fill in the relative placements
+	# (one column at a time, only for the routines not yet at a majority)
 	def __fill_columns(self, places, place): 
-		if len(places) == 0: return
-		for routine, scores in places.items():
-			num_places = self.__count(place, scores)
-			if routine not in self.relative_placements:
-				self.relative_placements[routine] = {place:num_places}
-			else:
-				self.relative_placements[routine][place] = num_places
-			if num_places >= self.majority: del places[routine]
-		self.__fill_columns(places, place+1)
+		while len(places) > 0:
+			for routine, scores in places.items():
+				num_places = self.__count(place, scores)
+				if routine not in self.relative_placements:
+					self.relative_placements[routine] = {place:num_places}
+				else:
+					self.relative_placements[routine][place] = num_places
+				if num_places >= self.majority: del places[routine]
+			place += 1
 	
 	def __cathunk(self, relative_places, place, placement):
-		if len(relative_places) == 0: return
-		majorities = dict()
-		for routine, placecounts in relative_places.items():
-			if placecounts[place] >= self.majority: 
-				majorities[routine] = placecounts
-				del relative_places[routine]
-		x = len(majorities)
-		if   len(majorities) == 0: self.__cathunk(relative_places, place+1, placement)
-		elif len(majorities) == 1: 
-			self.final_placements[majorities.keys()[0]] = placement
-			self.__cathunk(relative_places, place+1, placement+1)
-		else:
-			self.__ties(majorities, place, placement)
-		self.__cathunk(relative_places, place+1, placement+x)
+		while len(relative_places) > 0:
+			majorities = dict()
+			for routine, placecounts in relative_places.items():
+				if placecounts[place] >= self.majority: 
+					majorities[routine] = placecounts
+					del relative_places[routine]
+			x = len(majorities)
+			if   x == 1: 
+				self.final_placements[majorities.keys()[0]] = placement
+			elif x > 1:
+				self.__ties(majorities, place, placement)
+			placement += x
+			place     += 1
 	
 	# We need to deal with ties!!
+	# Each step returns the tied groups it leaves behind, which go on a work
+	# list rather than the call stack, in the order they used to be recursed.
 	def __ties(self, ties, place, placement):
+		work = [(self.__sum_step, ties, place, placement)]
+		while work:
+			step, ties, place, placement = work.pop()
+			work.extend(reversed(step(ties, place, placement)))
+	
+	def __sum_step(self, ties, place, placement):
 		if place > len(self.places):
 			self.__chiefjudgetie(ties, placement)
-			return
-		if len(ties) == 0: return
+			return []
+		if len(ties) == 0: return []
 		if len(ties) == 1:
 			routine,_ = ties.popitem()
 			self.final_placements[routine] = placement
-			return
+			return []
 		tie = dict()
 		winner    = None
 		winnersum = None
@@ -99,23 +110,22 @@ class Relative_Placements:
 			x = len(tie)
 			for routine in tie:
 				del ties[routine]
-			self.__down(tie, place+1, placement)
-			self.__ties(ties, place, placement+x)
-			return
+			return [(self.__down_step, tie,  place+1, placement),
+			        (self.__sum_step,  ties, place,   placement+x)]
 		self.final_placements[winner] = placement
 		del ties[winner]
-		self.__ties(ties, place, placement+1)
+		return [(self.__sum_step, ties, place, placement+1)]
 	
-	def __down(self, ties, place, placement):
+	def __down_step(self, ties, place, placement):
 		if place > len(self.places):
 			self.__chiefjudgetie(ties, placement)
-			return
+			return []
 		if len(ties) == 0:
-			return
+			return []
 		if len(ties) == 1:
 			routine,_ = ties.popitem()
 			self.final_placements[routine] = placement
-			return
+			return []
 		tie = dict()
 		winner      = None
 		winnercount = None
@@ -124,9 +134,9 @@ class Relative_Placements:
 			self.relative_placements[routine][place] = count 
 			if winner == None:
 				winner      = routine
-				winnercount = self.__count(place, scores)
+				winnercount = count
 				continue
-			currentcount = self.__count(place, scores)
+			currentcount = count
 			if currentcount == winnercount:
 				tie[winner]  = self.places[winner]
 				tie[routine] = self.places[routine]
@@ -137,16 +147,12 @@ class Relative_Placements:
 		if len(tie) == 0:
 			self.final_placements[winner] = placement
 			del ties[winner]
-			self.__down(ties, place, placement+1)
-			return
-		if len(tie) > 0:
-			x = len(tie)
-			for routine in tie:
-				del ties[routine]
-			self.__down(tie, place+1, placement)
-			self.__ties(ties, place, placement+x)
-			return
-		self.__down(ties, place+1, placement)
+			return [(self.__down_step, ties, place, placement+1)]
+		x = len(tie)
+		for routine in tie:
+			del ties[routine]
+		return [(self.__down_step, tie,  place+1, placement),
+		        (self.__sum_step,  ties, place,   placement+x)]
 	
 	def __chiefjudgetie(self, ties, placement):
 		headjudgescores = dict()
@@ -159,23 +165,20 @@ class Relative_Placements:
 		return
 
 	# count the number of placements
+	# (in one pass, leaving out the head judge unless they are included)
 	def __count(self, place, scores):
-		num_places = sum([1 if s <= place else 0 for s in scores.values()])
-		if not self.include:
-			num_places = 0
-			for j,s in scores.items():
-				if s <= place and j is not self.headjudge:
-					num_places += 1
+		num_places = 0
+		for j,s in scores.items():
+			if s <= place and (self.include or j != self.headjudge):
+				num_places += 1
 		return num_places
 	
 	# sum all of the scores under a placements
 	def __sum(self, place, scores):
-		num_places = sum([s if s <= place else 0 for s in scores.values()])
-		if not self.include:
-			num_places = 0
-			for j,s in scores.items():
-				if s <= place and j is not self.headjudge:
-					num_places += s
+		num_places = 0
+		for j,s in scores.items():
+			if s <= place and (self.include or j != self.headjudge):
+				num_places += s
 		return num_places
 		
 	def __str__(self):
@@ -184,29 +187,32 @@ class Relative_Placements:
 		
 		placements = len(self.places)
 		
-		strng = 'order,'
+		## every row is built as a list of cells and joined once
+		header = ['order,']
 		for j in self.places.iteritems().next()[1].iterkeys():
-			strng += ' J%-2s,' % j
+			header.append(' J%-2s,' % j)
 		
 		for i in range(placements):
-			strng += ' 1-%-2d,' % (i+1)
-		strng += 'placement\n'
+			header.append(' 1-%-2d,' % (i+1))
+		header.append('placement\n')
+		rows = [''.join(header)]
 		
 		for routine, scores in self.places.items():
 			# print the routine and it's score
-			strng += '%5s,' % routine
+			row = ['%5s,' % routine]
 			for _, score in scores.items():
-				strng += '%2s,' % score
+				row.append('%2s,' % score)
 			# print the routine's relative placement count
 			for i in range(placements):
 				count = rp[routine][i+1] if i+1 in rp[routine] else '---->'
 				if isinstance(count, dict):
 					count = '%s(%s)' % (count['count'], count['sum'])
 				count = count if count != 0 else '-----'
-				strng += '%5s,' % count
+				row.append('%5s,' % count)
 			# print the final placements
-			strng += '%2s\n' % fp[routine]
-		return strng
+			row.append('%2s\n' % fp[routine])
+			rows.append(''.join(row))
+		return ''.join(rows)
 
 	def pprint_relative_placements(self):
 		for k,v in self.relative_placements.items():
@@ -221,7 +227,8 @@ class Relative_Placements:
 			print '%2s :' % k, v
 		print
 		
-	def pprint(self):
+	def pprint(self, file=None, format='text'):
+		from render import Group, Layout, render
 		rp = self.relative_placements
 		fp = self.final_placements
 		
@@ -230,48 +237,25 @@ class Relative_Placements:
 		_,judges = places.popitem()
 		numjudges = len(judges)
 		
-		seprt  = '---------------++'
-		seprt += '-'*(numjudges*6-1)+'++'
-		seprt += '-'*(len(fp)*6-1)+'++'
-		seprt += '----------\n'
-		
-		seprt2  = '---------------++'
-		seprt2 += '-----+'*(numjudges)+'+'
-		seprt2 += '-----+'*(len(fp))+'+'
-		seprt2 += '----------\n'
-		
-		strng =  '               ||'
-		strng += str.center('Judge Placement',   numjudges*6-1) + '||'
-		strng += str.center('Relative Placement',len(fp)*6-1) + '||\n'
-		strng += seprt
-		strng += ' Routine Order ||'
-		
-		for j in self.places.iteritems().next()[1].iterkeys():
-			strng += '  J%-2s|' % j
-		
-		strng += '|'
-		
-		for i in range(placements):
-			strng += ' 1-%-2d|' % (i+1)
-		strng += '|Placements\n' + seprt2
+		layout = Layout([Group('',                   1,         15, '%13s  ', ' %s '),
+		                 Group('Judge Placement',    numjudges, 5,  '%3s  ',  '  %-3s'),
+		                 Group('Relative Placement', len(fp),   5,  '%5s',    ' %-4s'),
+		                 Group(None,                 1,         10, '%5s')])
+		headings = [['Routine Order'],
+		            ['J%s' % j for j in self.places.iteritems().next()[1].iterkeys()],
+		            ['1-%d' % (i+1) for i in range(placements)], ['Placements']]
 		
-		for routine, scores in self.places.items():
-			# print the routine and it's score
-			strng += '%13s  ||' % routine
-			for _, score in scores.items():
-				strng += '%3s  |' % score
-			strng += '|'
-			# print the routine's relative placement count
-			for i in range(placements):
-				count = rp[routine][i+1] if i+1 in rp[routine] else '---->'
-				if isinstance(count, dict):
-					count = '%s(%s)' % (count['count'], count['sum'])
-				count = count if count != 0 else '-----'
-				strng += '%5s|' % count
-			# print the final placements
-			strng += '|%5s\n' % fp[routine] + seprt2
-		print strng
-
+		def rows():
+			for routine, scores in self.places.items():
+				# the routine's relative placement count
+				counts = []
+				for i in range(placements):
+					count = rp[routine][i+1] if i+1 in rp[routine] else '---->'
+					if isinstance(count, dict):
+						count = '%s(%s)' % (count['count'], count['sum'])
+					counts.append(count if count != 0 else '-----')
+				yield [[routine], scores.values(), counts, [fp[routine]]]
+		render(layout, headings, rows(), file, format)
 
 scores = {
 	1 : {1:1, 2:1, 3:3, 4:2, 5:3},
@@ -0,0 +1,220 @@
+''' a memory-mapped binary archive of score sheets
+
+Re-reading text mark sheets every time an event is rescrutineered or reported on
+is wasteful once there is a season of them. An archive holds any number of
+events in one binary file
+
+    header   magic 'RPSA', version, event count, offset of the index
+    events   for every event, one after another:
+                 counts    routines, judges, head judge, bytes per mark
+                 symbols   the event name, judges and routines as length
+                           prefixed UTF-8 strings (labels that aren't
+                           strings are stored as their str, and read back
+                           as strings)
+                 marks     the routines x judges marks, one block of
+                           uint8 (or uint16 for fields over 255) in row order
+    index    the offset of every event
+
+It is written straight from the parsers
+
+    >>> with open('season.txt') as file:
+    ...     write_archive('season.rpa', iter_score_sheets(file))
+
+and read through `mmap`, so opening an event out of thousands is a seek in the
+index and a view of its marks; nothing is parsed or copied
+
+    >>> archive = Archive('season.rpa')
+    >>> marks   = archive.marks(1041)   # a zero-copy (routines x judges) view
+    >>> places  = archive.score(1041)   # placed straight from that view
+
+All numbers are little-endian.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import mmap
+import struct
+import sys
+from array import array
+
+from score_sheet import ScoreSheet
+
+MAGIC   = b'RPSA'
+VERSION = 1
+HEADER  = struct.Struct('<4sHHIQ')  # magic, version, reserved, events, index
+COUNTS  = struct.Struct('<IIiI')    # routines, judges, head judge, bytes per mark
+LENGTH  = struct.Struct('<H')
+OFFSET  = struct.Struct('<Q')
+
+
+def _encode(label):
+	''' A label as a length prefixed UTF-8 string; labels that aren't strings,
+	such as int routine numbers, are written as their `str` '''
+	if not isinstance(label, bytes):
+		if not isinstance(label, type(u'')): label = str(label)
+		label = label.encode('utf-8')
+	return LENGTH.pack(len(label)) + label
+
+def _decode(buffer, offset):
+	''' Reads a length prefixed string, returning it and the offset after it '''
+	length, = LENGTH.unpack_from(buffer, offset)
+	offset += LENGTH.size
+	label = buffer[offset:offset+length]
+	return (label if str is bytes else label.decode('utf-8')), offset+length
+
+def _tobytes(marks):
+	if sys.byteorder == 'big':
+		marks = array(marks.typecode, marks)
+		marks.byteswap()
+	return marks.tobytes() if hasattr(marks, 'tobytes') else marks.tostring()
+
+def write_archive(path, events):
+	''' Writes events to a new archive
+
+	Parameters
+	----------
+	path: str
+	the file to write
+
+	events: iterable
+	(name, scores) pairs, where scores is a `ScoreSheet` or a {routine: {judge:
+	placement}} dictionary, such as `input_output.iter_score_sheets` yields, or
+	(name, scores, head_judge) triples. Events are written as they come, so a
+	generator is never held in memory
+
+	Returns
+	-------
+	int
+	the number of events written
+
+	'''
+	offsets = []
+	with open(path, 'wb') as file:
+		file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+		for event in events:
+			name, sheet = event[0], event[1]
+			head_judge  = event[2] if len(event) > 2 else None
+			if not isinstance(sheet, ScoreSheet):
+				sheet = ScoreSheet.from_dict(sheet)
+			width = 1 if max(sheet.marks or [0]) < 256 else 2
+			offsets.append(file.tell())
+			file.write(COUNTS.pack(len(sheet.routines), len(sheet.judges),
+			                       sheet.judge_index.get(head_judge, -1), width))
+			file.write(b''.join(_encode(label) for label in
+			                    [name] + list(sheet.judges) + list(sheet.routines)))
+			## keep uint16 blocks aligned, so they can be viewed in place
+			if width == 2 and file.tell() % 2: file.write(b'\0')
+			file.write(_tobytes(array('B' if width == 1 else 'H', sheet.marks)))
+		index = file.tell()
+		file.write(b''.join(OFFSET.pack(offset) for offset in offsets))
+		file.seek(0)
+		file.write(HEADER.pack(MAGIC, VERSION, 0, len(offsets), index))
+	return len(offsets)
+
+class Archive(object):
+	''' A read-only, memory-mapped archive
+
+	Parameters
+	----------
+	path: str
+	the archive file
+
+	'''
+	def __init__(self, path):
+		self.file   = open(path, 'rb')
+		self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, version, _, self.num_events, self.index = HEADER.unpack_from(self.buffer, 0)
+		if magic != MAGIC:
+			raise ValueError('%s is not a score archive' % path)
+		if version != VERSION:
+			raise ValueError('%s is version %d of the archive format' % (path, version))
+
+	def __len__(self):
+		return self.num_events
+
+	def event(self, e):
+		''' Reads an event's header and symbols
+
+		Returns
+		-------
+		tuple : str, list, list, hashable, int, int
+		the name, judges, routines and head judge (None if it has none) of the
+		event, the bytes per mark and the offset of its marks
+
+		'''
+		if not 0 <= e < self.num_events: raise IndexError(e)
+		offset, = OFFSET.unpack_from(self.buffer, self.index + e*OFFSET.size)
+		num_routines, num_judges, head, width = COUNTS.unpack_from(self.buffer, offset)
+		offset += COUNTS.size
+		labels  = []
+		for _ in range(1 + num_judges + num_routines):
+			label, offset = _decode(self.buffer, offset)
+			labels.append(label)
+		if width == 2 and offset % 2: offset += 1
+		judges, routines = labels[1:num_judges+1], labels[num_judges+1:]
+		return (labels[0], judges, routines, judges[head] if head >= 0 else None,
+		        width, offset)
+
+	def marks(self, e):
+		''' The (routines x judges) marks of an event, as a view of the archive
+		'''
+		import numpy
+		_, judges, routines, _, width, offset = self.event(e)
+		marks = numpy.frombuffer(self.buffer, '<u%d' % width,
+		                         len(routines)*len(judges), offset)
+		return marks.reshape(len(routines), len(judges))
+
+	def sheet(self, e):
+		''' An event as a `ScoreSheet`, ready for `scoring.competition`
+		'''
+		_, judges, routines, _, width, offset = self.event(e)
+		marks = array('B' if width == 1 else 'H')
+		data  = self.buffer[offset:offset + width*len(routines)*len(judges)]
+		if hasattr(marks, 'frombytes'): marks.frombytes(data)
+		else:                           marks.fromstring(data)
+		if sys.byteorder == 'big': marks.byteswap()
+		return ScoreSheet(routines, judges, array('H', marks))
+
+	def score(self, e, included=True):
+		''' Places an event straight from its marks in the archive
+
+		Returns
+		-------
+		dict
+		the {place: routine} placements, as `scoring.competition` gives them
+
+		'''
+		from batch import batch_competition, unstack_placements
+		_, judges, routines, head_judge, _, _ = self.event(e)
+		head   = judges.index(head_judge) if head_judge is not None else -1
+		places = batch_competition(self.marks(e)[None], [head], included)
+		return unstack_placements(places, [routines])[0]
+
+	def close(self):
+		self.buffer.close()
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+if __name__ == '__main__':
+	import argparse
+	from input_output import iter_score_sheets
+
+	parser = argparse.ArgumentParser(description='write score files to an archive')
+	parser.add_argument('archive', help='the archive to write')
+	parser.add_argument('files', nargs='+', type=argparse.FileType('r'),
+	                    help='the score files, each with one or more events')
+	parser.add_argument('--head', default=None,
+	                    help='the head judge of every event')
+	args = parser.parse_args()
+
+	def events():
+		for file in args.files:
+			for name, sheet in iter_score_sheets(file):
+				yield name or file.name, sheet, args.head
+	print write_archive(args.archive, events()), 'events written'
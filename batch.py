@@ -0,0 +1,307 @@
+''' vectorized relative placement scoring for many events at once
+
+Scoring a whole session with `scoring.competition` means running the dictionary
+based engine once per heat. This module does the same work on a single stacked
+array of marks
+
+    marks[event, routine, judge] = placement
+
+where events with fewer routines or judges are padded with 0 (no mark). The
+tally, majority, sum and head judge steps are all done with NumPy operations over
+every event at the same time, so a session can be re-scrutineered in one call
+
+    >>> marks, routines, judges, heads = stack_scores(events, head_judges)
+    >>> places = batch_competition(marks, heads)
+    >>> placements = unstack_placements(places, routines)
+
+The tie breaking follows the same cascade as `scoring.competition`: sum of the
+marks at the majority column, then the tally of the next column, and so on, with
+the head judge's marks as the final fallback.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import numpy as np
+
+from score_sheet import ScoreSheet
+
+## modes of a tied group while we refine the placements
+SUM, TALLY, HEAD = 0, 1, 2
+
+
+def stack_scores(events, head_judges=None):
+	''' Packs a list of score dictionaries into one padded array of marks
+
+	Parameters
+	----------
+	events: list
+	a list of {routine: {judge: placement}} dictionaries or `ScoreSheet`s. The
+	routines of a dictionary are packed in sorted order, those of a sheet in
+	the order they are on the sheet
+
+	head_judges: list, optional
+	the head judge of every event, or None if an event has no head judge
+
+	Returns
+	-------
+	tuple : ndarray, list, list, ndarray
+	the (events x routines x judges) array of marks padded with 0, the routines
+	and the judges of every event in the order they were packed, and the index
+	of every event's head judge (-1 if there is none)
+
+	'''
+	if head_judges is None: head_judges = [None]*len(events)
+	routines = []
+	judges   = []
+	for scores in events:
+		if isinstance(scores, ScoreSheet):
+			routines.append(scores.routines)
+			judges.append(scores.judges)
+			continue
+		event_judges = set()
+		for placements in scores.values():
+			event_judges.update(placements)
+		routines.append(sorted(scores))
+		judges.append(sorted(event_judges))
+	num_routines = max([len(r) for r in routines] or [0])
+	num_judges   = max([len(j) for j in judges]   or [0])
+	marks = np.zeros((len(events), num_routines, num_judges), dtype=np.uint16)
+	heads = np.empty(len(events), dtype=np.intp)
+	for e, scores in enumerate(events):
+		if isinstance(scores, ScoreSheet):
+			index = scores.judge_index
+			marks[e, :len(scores.routines), :len(scores.judges)] = scores.as_array()
+		else:
+			index = dict((judge, j) for j, judge in enumerate(judges[e]))
+			for r, routine in enumerate(routines[e]):
+				for judge, mark in scores[routine].items():
+					marks[e, r, index[judge]] = mark
+		heads[e] = index.get(head_judges[e], -1)
+	return marks, routines, judges, heads
+
+def batch_tally(marks, heads=None, included=True):
+	''' Builds the cumulative tally and sum tables of every event
+
+	This is the vectorized version of `scoring.tally_table`. Every mark is
+	dropped into a (event, routine, place) histogram with a single `bincount`
+	and a running sum along the places turns it into the cumulative tables.
+
+	Parameters
+	----------
+	marks: ndarray
+	the (events x routines x judges) marks, padded with 0
+
+	heads: ndarray, optional
+	the index of every event's head judge (-1 for none)
+
+	included: bool or ndarray, optional
+	whether the head judge's marks are tallied, for all events or per event
+
+	Returns
+	-------
+	tuple : ndarray, ndarray
+	the (events x routines x places+1) tally and sum tables, where column 0 is
+	always 0 so the tables can be indexed by placement
+
+	'''
+	marks = np.asarray(marks)
+	E, R, J = marks.shape
+	P = R + 1
+	weight = (marks > 0) & (marks <= R)
+	if heads is not None:
+		heads    = np.asarray(heads)
+		excluded = ~np.broadcast_to(np.asarray(included, dtype=bool), (E,))
+		excluded = excluded & (heads >= 0)
+		weight[excluded, :, heads[excluded]] = False
+	cells = (np.arange(E*R).reshape(E, R, 1)*P + marks)[weight]
+	hist  = np.bincount(cells, minlength=E*R*P)
+	sums  = np.bincount(cells, weights=marks[weight], minlength=E*R*P)
+	tallies = np.cumsum(hist.reshape(E, R, P), axis=2)
+	sums    = np.cumsum(sums.reshape(E, R, P), axis=2).astype(np.int64)
+	return tallies, sums
+
+def _split(group, base, key):
+	''' Splits every group by `key`, giving each new sub group its place
+
+	The groups are sorted by key and every run of equal keys becomes a new
+	group whose first place is the group's first place plus the number of
+	elements with a smaller key.
+
+	Returns
+	-------
+	tuple : ndarray, ndarray, ndarray, ndarray
+	the order the elements were sorted in, the new group ids, the new first
+	places and the sizes of the new groups
+
+	'''
+	order = np.lexsort((key, group))
+	group, base, key = group[order], base[order], key[order]
+	n     = len(order)
+	first = np.ones(n, dtype=bool)
+	first[1:] = group[1:] != group[:-1]
+	run   = first.copy()
+	run[1:] |= key[1:] != key[:-1]
+	position   = np.arange(n)
+	group_head = np.maximum.accumulate(np.where(first, position, 0))
+	run_head   = np.maximum.accumulate(np.where(run,   position, 0))
+	new_group  = np.cumsum(run) - 1
+	size       = np.bincount(new_group)[new_group]
+	return order, new_group, base + run_head - group_head, size
+
+def batch_place(tallies, sums, majority, num_routines, head_marks=None):
+	''' Places the routines of every event from their tally and sum tables
+
+	Step 1: every routine's majority column is found at once
+	Step 2: routines are ranked on their majority column
+	Step 3-4: every tied group, in every event, is refined one column at a time
+	with the same sum -> next column tally -> head judge cascade as
+	`scoring.competition`. Each pass handles all of the remaining ties together.
+
+	Parameters
+	----------
+	tallies: ndarray
+	the (events x routines x places+1) cumulative tallies
+
+	sums: ndarray
+	the (events x routines x places+1) cumulative sums
+
+	majority: ndarray
+	the majority needed in each event
+
+	num_routines: ndarray
+	the number of (real) routines in each event; padding routines must come
+	after the real ones
+
+	head_marks: ndarray, optional
+	the (events x routines) marks of each event's head judge
+
+	Returns
+	-------
+	ndarray
+	the (events x routines) placement of every routine, 0 for padding
+
+	'''
+	E, R, P = tallies.shape
+	majority     = np.asarray(majority).reshape(E, 1, 1)
+	num_routines = np.asarray(num_routines).reshape(E)
+	places = np.zeros((E, R), dtype=np.intp)
+	if head_marks is None:
+		head_marks = np.zeros((E, R), dtype=np.intp)
+	## Step 1: the first column where each routine reaches a majority
+	reached = tallies >= majority
+	column  = np.where(reached.any(axis=2), reached.argmax(axis=2), P)
+	event, routine = np.nonzero(np.arange(R) < num_routines[:, None])
+	## Step 2: rank on the majority column
+	order, group, base, size = _split(event, np.ones(len(event), np.intp),
+	                                  column[event, routine])
+	event, routine = event[order], routine[order]
+	column = column[event, routine]
+	mode   = np.full(len(event), SUM, dtype=np.intp)
+	## Step 3-4: refine the ties until every group holds a single routine
+	while True:
+		done = size == 1
+		places[event[done], routine[done]] = base[done]
+		tied  = ~done
+		if not tied.any(): break
+		event, routine = event[tied], routine[tied]
+		group, base, column, mode = group[tied], base[tied], column[tied], mode[tied]
+		mode[column >= num_routines[event]] = HEAD
+		key = sums[event, routine, np.minimum(column, P-1)]
+		## in tally mode only the routines with the best tally break away
+		tally = np.where(mode == TALLY,
+		                 tallies[event, routine, np.minimum(column, P-1)], 0)
+		best  = np.zeros(group.max()+1, dtype=tally.dtype)
+		np.maximum.at(best, group, tally)
+		key = np.where(mode == TALLY, (tally < best[group]).astype(key.dtype), key)
+		## the head judge decides everything that is left
+		head = head_marks[event, routine].astype(np.int64)*(R+1) + routine
+		key  = np.where(mode == HEAD, head, key)
+		order, group, base, size = _split(group, base, key)
+		event, routine = event[order], routine[order]
+		column, mode, key = column[order], mode[order], key[order]
+		## sum ties and tally ties move on to the tally of the next column,
+		## the routines that lost a tally are ranked by sum in the same column
+		lost   = (mode == TALLY) & (key == 1)
+		column = np.where(lost, column, column+1)
+		mode   = np.where(lost, SUM, TALLY)
+	return places
+
+def batch_competition(marks, heads=None, included=True):
+	''' Scores a stack of events with the relative placement method
+
+	Parameters
+	----------
+	marks: ndarray
+	the (events x routines x judges) marks, padded with 0. Padding routines
+	must come after the real routines of an event
+
+	heads: ndarray, optional
+	the index of every event's head judge (-1 for none)
+
+	included: bool or ndarray, optional
+	whether the head judge's marks are tallied, for all events or per event
+
+	Returns
+	-------
+	ndarray
+	the (events x routines) placement of every routine, 0 for padding
+
+	'''
+	marks = np.asarray(marks)
+	E, R, J = marks.shape
+	if heads is None: heads = np.full(E, -1, dtype=np.intp)
+	heads = np.asarray(heads)
+	tallies, sums = batch_tally(marks, heads, included)
+	num_judges   = (marks > 0).any(axis=1).sum(axis=1)
+	num_routines = (marks > 0).any(axis=2).sum(axis=1)
+	head_marks   = np.where((heads >= 0)[:, None],
+	                        marks[np.arange(E), :, np.maximum(heads, 0)], 0)
+	return batch_place(tallies, sums, (num_judges+1)//2, num_routines, head_marks)
+
+def unstack_placements(places, routines):
+	''' Turns the placements array back into {place: routine} dictionaries
+
+	Parameters
+	----------
+	places: ndarray
+	the (events x routines) placements from `batch_competition`
+
+	routines: list
+	the routines of every event, as returned by `stack_scores`
+
+	Returns
+	-------
+	list
+	one {place: routine} dictionary per event, the same as the placements
+	returned by `scoring.competition`
+
+	'''
+	placements = []
+	for e, event_routines in enumerate(routines):
+		placements.append(dict((int(places[e, r]), routine)
+		                       for r, routine in enumerate(event_routines)))
+	return placements
+
+def score_events(events, head_judges=None, included=True):
+	''' Scores a list of score dictionaries in one vectorized pass
+
+	Parameters
+	----------
+	events: list
+	a list of {routine: {judge: placement}} dictionaries
+
+	head_judges: list, optional
+	the head judge of every event
+
+	included: bool, optional
+	whether the head judges' marks are tallied
+
+	Returns
+	-------
+	list
+	one {place: routine} dictionary per event
+
+	'''
+	marks, routines, _, heads = stack_scores(events, head_judges)
+	return unstack_placements(batch_competition(marks, heads, included), routines)
@@ -0,0 +1,296 @@
+#!/usr/bin/python2.7
+''' benchmarks for the scoring engines
+
+This times every engine on the same synthetic mark sheets and reports the
+throughput and peak memory of each run. The results can be saved as a baseline
+and later runs compared against it to catch regressions:
+
+>>> python benchmark.py --sizes 6 60 200 --judges 5 9 --save baseline.json
+>>> python benchmark.py --sizes 6 60 200 --judges 5 9 --compare baseline.json
+
+The sheets come from `generate_field`, which models a real panel: every couple has
+an underlying standard, every judge sees it through their own noise (so the judges
+agree with each other as much as `correlation` says), and a fraction of couples
+can be forced into exact ties so the tie breaking gets exercised as well.
+
+Every engine run happens in its own child process, so the peak memory reported
+is that engine's alone.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+
+def generate_field(num_routines, num_judges, correlation=0.8, ties=0.1, seed=None):
+	''' Generates a realistic {routine: {judge: placement}} mark sheet
+
+	Parameters
+	----------
+	num_routines: int
+	the number of couples on the floor
+
+	num_judges: int
+	the number of judges on the panel
+
+	correlation: float, optional
+	how closely the judges agree, from 0 (every judge marks at random) to 1
+	(every judge gives the same marks)
+
+	ties: float, optional
+	the fraction of couples that are paired up and given exactly the same set
+	of marks, so that they tie on every tally and sum. With an odd panel this
+	needs at least 3 couples
+
+	seed: hashable, optional
+	the seed for the random numbers, for sheets that can be reproduced
+
+	Returns
+	-------
+	dict
+	the {routine: {judge: placement}} scores. Routines are '1'..'R' and judges
+	are '1'..'J'
+
+	'''
+	rnd      = random.Random(seed)
+	routines = [str(r+1) for r in range(num_routines)]
+	judges   = [str(j+1) for j in range(num_judges)]
+	ability  = [rnd.gauss(0, 1) for _ in routines]
+	noise    = math.sqrt(max(0.0, 1 - correlation**2))
+	## every judge ranks the couples on what they saw
+	sheets = []
+	for _ in judges:
+		seen  = [correlation*a + noise*rnd.gauss(0, 1) for a in ability]
+		order = sorted(range(num_routines), key=lambda r: -seen[r])
+		marks = [0]*num_routines
+		for place, r in enumerate(order):
+			marks[r] = place+1
+		sheets.append(marks)
+	## pairs of judges mirror a pair of couples' marks, and with an odd panel
+	## the last three judges rotate three marks between them, so the two
+	## couples end up with the same marks overall. The marks are swapped with
+	## whoever had them, so every judge's marks stay a ranking; a pair that
+	## would need to take a mark from an already tied couple is passed over
+	## for the next one
+	by_ability = sorted(range(num_routines), key=lambda r: -ability[r])
+	pairs  = int(num_routines*ties) / 2
+	odd    = num_judges % 2
+	paired = num_judges - 3*odd
+	if odd and (num_judges < 3 or num_routines < 3): pairs = 0
+	tied   = set()
+	for a, b in zip(by_ability[0::2], by_ability[1::2]):
+		if len(tied) >= 2*pairs: break
+		wanted = []
+		for j in range(0, paired, 2):
+			wanted.append((j+1, ((b, sheets[j][a]), (a, sheets[j][b]))))
+		if odd:
+			first, second, third = paired, paired+1, paired+2
+			x, y = sheets[first][a], sheets[first][b]
+			free = [z for z in range(1, num_routines+1) if z not in (x, y) and
+			        sheets[second].index(z) not in tied and
+			        sheets[third].index(z)  not in tied]
+			if not free: continue
+			z = sheets[second][b] if sheets[second][b] in free else free[0]
+			wanted.append((second, ((a, y), (b, z))))
+			wanted.append((third,  ((a, z), (b, x))))
+		if any(sheets[j].index(mark) in tied for j, give in wanted for _, mark in give):
+			continue
+		for j, give in wanted:
+			for r, mark in give:
+				other = sheets[j].index(mark)
+				sheets[j][other], sheets[j][r] = sheets[j][r], sheets[j][other]
+		tied.update((a, b))
+	return dict((routine, dict((judge, sheets[j][r]) for j, judge in enumerate(judges)))
+	            for r, routine in enumerate(routines))
+
+def _engines():
+	''' The {name: function(scores, head_judge)} engines that can be timed '''
+	from scoring            import competition, lazy_competition
+	from score_sheet        import ScoreSheet
+	from Relative_Placement import Relative_Placements
+	import scoring2
+	engines = {
+		'competition'        : lambda s, h: competition(s, h),
+		'competition-sheet'  : lambda s, h: competition(s, h),
+		'competition-compact': lambda s, h: competition(s, h, compact=True),
+		'lazy_competition'   : lambda s, h: lazy_competition(s, h),
+		'Relative_Placements': lambda s, h: Relative_Placements(
+		                           s, h, (len(s.itervalues().next())+1)/2, True),
+		'scoring2'           : lambda s, h: scoring2.relative_placements(s, h),
+	}
+	try:
+		import batch
+		engines['batch'] = lambda s, h: batch.score_events([s], [h])
+	except ImportError:
+		pass
+	## some engines take the scores in another form, prepared before timing
+	prepare = {'competition-sheet': ScoreSheet.from_dict}
+	return engines, prepare
+
+def _status(field):
+	''' A memory figure of this process from /proc, in KB '''
+	with open('/proc/self/status') as file:
+		for line in file:
+			if line.startswith(field + ':'):
+				return int(line.split()[1])
+	raise KeyError(field)
+
+def _reset_peak():
+	''' Resets the peak memory of this process where the system allows it, and
+	returns the memory in use now, in KB
+
+	Linux resets the peak when '5' is written to /proc/self/clear_refs. Without
+	that the peak can only be read as the most the process has ever used, so
+	the figures are then only an upper bound.
+	'''
+	try:
+		with open('/proc/self/clear_refs', 'w') as file:
+			file.write('5')
+		return _status('VmRSS')
+	except (IOError, OSError, KeyError):
+		return _peak_memory()
+
+def _peak_memory():
+	''' The peak resident memory of this process, in KB '''
+	try:
+		return _status('VmHWM')
+	except (IOError, OSError, KeyError):
+		import resource
+		peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		return peak / 1024 if sys.platform == 'darwin' else peak
+
+def _run(engine, num_routines, num_judges, seed, repeat, pipe):
+	''' Child side: times one engine on one sheet and sends back the result, or
+	the error if the engine failed '''
+	try:
+		pipe.send(_time(engine, num_routines, num_judges, seed, repeat))
+	except Exception as error:
+		pipe.send({'error': '%s: %s' % (type(error).__name__, error)})
+	pipe.close()
+
+def _time(engine, num_routines, num_judges, seed, repeat):
+	engines, prepare = _engines()
+	scores = generate_field(num_routines, num_judges, seed=seed)
+	scores = prepare.get(engine, lambda s: s)(scores)
+	head   = str((num_judges+1)/2)
+	## keep the engines' own chatter off the report
+	stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+	try:
+		best = None
+		peak = 0
+		for _ in range(repeat):
+			before  = _reset_peak()
+			start   = time.time()
+			engines[engine](scores, head)
+			elapsed = time.time() - start
+			best = elapsed if best is None else min(best, elapsed)
+			peak = max(peak, _peak_memory() - before)
+	finally:
+		sys.stdout.close()
+		sys.stdout = stdout
+	return {'seconds': best, 'memory_kb': peak,
+	        'routines_per_second': num_routines / max(best, 1e-9)}
+
+def benchmark(engines, sizes, judges, repeat=3, seed=0):
+	''' Times every engine on every size of field and panel
+
+	Parameters
+	----------
+	engines: list
+	the names of the engines to time
+
+	sizes: list
+	the numbers of routines to generate fields of
+
+	judges: list
+	the numbers of judges to generate panels of
+
+	repeat: int, optional
+	the number of runs of each engine, of which the fastest is kept
+
+	seed: hashable, optional
+	the seed for the generated fields; every engine sees the same fields
+
+	Returns
+	-------
+	dict
+	{'engine/routines/judges': {'seconds', 'memory_kb', 'routines_per_second'}},
+	or {'error'} for a run whose engine failed or died
+
+	'''
+	results = {}
+	for num_routines in sizes:
+		for num_judges in judges:
+			for engine in engines:
+				receive, send = multiprocessing.Pipe(False)
+				child = multiprocessing.Process(target=_run, args=(engine,
+				        num_routines, num_judges, seed, repeat, send))
+				child.start()
+				## only the child holds the sending end now, so if it dies
+				## the receive below ends instead of waiting forever
+				send.close()
+				try:
+					result = receive.recv()
+				except EOFError:
+					result = None
+				child.join()
+				receive.close()
+				if result is None:
+					result = {'error': 'the engine exited with code %s' % child.exitcode}
+				results['%s/%d/%d' % (engine, num_routines, num_judges)] = result
+	return results
+
+def report(results, baseline=None, file=sys.stdout):
+	''' Writes out a table of results, with the change from a baseline
+	'''
+	file.write('%-36s %12s %14s %10s %9s\n' %
+	           ('engine/routines/judges', 'seconds', 'routines/s', 'peak KB', 'change'))
+	for key in sorted(results, key=lambda k: (k.split('/')[0], int(k.split('/')[1]),
+	                                          int(k.split('/')[2]))):
+		result = results[key]
+		if 'error' in result:
+			file.write('%-36s FAILED %s\n' % (key, result['error']))
+			continue
+		change = ''
+		if baseline and 'seconds' in baseline.get(key, {}):
+			change = '%+.1f%%' % (100.0*(result['seconds'] /
+			                             max(baseline[key]['seconds'], 1e-9) - 1))
+		file.write('%-36s %12.6f %14.1f %10d %9s\n' %
+		           (key, result['seconds'], result['routines_per_second'],
+		            result['memory_kb'], change))
+
+if __name__ == '__main__':
+	import argparse
+
+	engines, _ = _engines()
+	parser = argparse.ArgumentParser(description='benchmark the scoring engines')
+	parser.add_argument('--engines', nargs='*', default=sorted(engines),
+	                    choices=sorted(engines), help='the engines to time')
+	parser.add_argument('--sizes',   nargs='*', type=int, default=[6, 20, 60, 200],
+	                    help='the numbers of routines (6 to 1000)')
+	parser.add_argument('--judges',  nargs='*', type=int, default=[3, 5, 9, 15],
+	                    help='the numbers of judges (3 to 15)')
+	parser.add_argument('--repeat',  type=int, default=3,
+	                    help='runs per engine, the fastest is kept')
+	parser.add_argument('--seed',    type=int, default=0,
+	                    help='the seed for the generated fields')
+	parser.add_argument('--save',    help='save the results as a baseline file')
+	parser.add_argument('--compare', help='compare against a baseline file')
+	args = parser.parse_args()
+
+	results  = benchmark(args.engines, args.sizes, args.judges, args.repeat, args.seed)
+	baseline = None
+	if args.compare:
+		with open(args.compare) as file:
+			baseline = json.load(file)
+	report(results, baseline)
+	if args.save:
+		with open(args.save, 'w') as file:
+			json.dump(results, file, indent=1, sort_keys=True)
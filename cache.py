@@ -0,0 +1,138 @@
+''' a cache of competition results, keyed on the marks themselves
+
+The same marks get scored over and over: reprints, exports in several formats,
+refreshing the UI. `ResultCache.competition` hashes the marks, the head judge and
+the `included` flag into a key, and only calls `scoring.competition` when it has
+not seen that key before
+
+    >>> cache = ResultCache(maxsize=256, directory='.score_cache')
+    >>> placements, reasons = cache.competition(scores, '3')
+    >>> placements, reasons = cache.competition(scores, '3') # a hit
+    >>> cache.hits, cache.misses
+    (1, 1)
+
+The key does not depend on the order of the routines or judges in `scores`, so a
+dictionary and a `ScoreSheet` of the same marks share an entry. The results in
+the cache are handed out as they are, so don't change them.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import hashlib
+import os
+import pickle
+from array       import array
+from collections import OrderedDict
+
+from scoring     import competition
+from score_sheet import ScoreSheet
+
+
+def score_key(scores, head_judge, included=True):
+	''' The canonical hash of a scoring request
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the scores
+
+	head_judge: hashable
+	the head judge
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	Returns
+	-------
+	str
+	a hex digest that is the same for the same marks, whatever order the
+	routines and judges are in
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	routines = sorted(scores.routines)
+	judges   = sorted(scores.judges)
+	marks    = array('H', [scores.mark(r, j) for r in routines for j in judges])
+	key = hashlib.sha1()
+	key.update(repr((routines, judges, head_judge, bool(included))).encode('utf-8'))
+	key.update(marks.tobytes() if hasattr(marks, 'tobytes') else marks.tostring())
+	return key.hexdigest()
+
+class ResultCache(object):
+	''' A bounded LRU cache of `scoring.competition` results
+
+	Parameters
+	----------
+	maxsize: int, optional
+	the number of results kept in memory; the least recently used is dropped
+	when there are more
+
+	directory: str, optional
+	a directory to also keep every result in, as a pickle named by its key, so
+	results survive after the program exits
+
+	Attributes
+	----------
+	hits: int
+	the number of requests answered from memory or disk
+
+	misses: int
+	the number of requests that had to be scored
+
+	'''
+	def __init__(self, maxsize=128, directory=None):
+		self.maxsize   = maxsize
+		self.directory = directory
+		self.hits      = 0
+		self.misses    = 0
+		self.__results = OrderedDict()
+		if directory and not os.path.isdir(directory):
+			os.makedirs(directory)
+
+	def competition(self, scores, head_judge, included=True):
+		''' `scoring.competition`, answered from the cache when possible
+		'''
+		key    = score_key(scores, head_judge, included)
+		result = self.__results.pop(key, None)
+		if result is None:
+			result = self.__load(key)
+		if result is None:
+			self.misses += 1
+			result = competition(scores, head_judge, included)
+			self.__store(key, result)
+		else:
+			self.hits += 1
+		## (re)inserting puts the key at the most recently used end
+		self.__results[key] = result
+		while len(self.__results) > self.maxsize:
+			self.__results.popitem(last=False)
+		return result
+
+	def clear(self):
+		''' Empties the in-memory cache and resets the counters
+		'''
+		self.__results.clear()
+		self.hits   = 0
+		self.misses = 0
+
+	def __len__(self):
+		return len(self.__results)
+
+	def __path(self, key):
+		return os.path.join(self.directory, key + '.pickle')
+
+	def __load(self, key):
+		if not self.directory or not os.path.exists(self.__path(key)):
+			return None
+		with open(self.__path(key), 'rb') as file:
+			return pickle.load(file)
+
+	def __store(self, key, result):
+		if not self.directory: return
+		## write then rename, so a reader never sees half a file
+		temp = self.__path(key) + '.tmp'
+		with open(temp, 'wb') as file:
+			pickle.dump(result, file, pickle.HIGHEST_PROTOCOL)
+		os.rename(temp, self.__path(key))
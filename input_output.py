@@ -4,6 +4,10 @@
 __author__  = 'Brooks MacBeth'
 __version__ = '1.0.0'
 
+import re
+
+from score_sheet import ScoreSheet
+
 def parse_input_file(file):
     ''' Parses an input file and returns the score dictionary
         
@@ -35,19 +39,18 @@ def parse_input_file(file):
         ...     print placements
     
     Here there should be output. Pretend there is
+
+    Raises
+    ------
+    ValueError
+        if a routine's line does not have exactly one mark for every judge
         
         '''
     scores = {} # a dictionary to hold the final scores
-    ## First we need to gather all of the lines so we can parse them one-by-one
-    lines = [line.strip().replace('\n','') for line in file.readlines()]
-    first, rest = lines[0], lines[1:]
-    ## Now we seperate out the judges to index them later
-    judges = first.split()
-    for line in rest:
-        line = line.split()
-        routine = line[0]
-        _scores = {judges[i]: int(line[i+1]) for i in range(len(judges))}
-        scores[routine] = _scores
+    ## the lines are read one at a time, only the first event is kept
+    for event, _, judges, routine, marks in iter_records(file):
+        if event != 0: break
+        scores[routine] = dict(zip(judges, marks))
     return scores
 
 def parse_score_file(file):
@@ -90,76 +93,378 @@ def parse_score_file(file):
     Here there should be output. Pretend there is
     
     '''
-    ## First we need to gather all of the lines so we can parse them one-by-one
-    lines = [line.strip().replace('\n','') for line in file.readlines()]
-    routine, judges = lines[0].split()[0], lines[0].split()[1:]
-    _scores = lines[1].split()
+    ## the file is only two lines, so read just those
+    first   = file.readline().split()
+    routine, judges = first[0], first[1:]
+    _scores = file.readline().split()
     scores = {judges[i]: int(_scores[i]) for i in range(len(judges))}
     return routine, scores
 
-def export_placements(scores, placements, reasons):
-	''' Returns a CSV of the placements
+def read_score_files(files, threads=8):
+    ''' Reads many single-routine score files at once on a pool of threads
+
+    Score files often come from network shares, where most of the time goes
+    into waiting for the file. The files are read and parsed with
+    `parse_score_file` by a pool of at most `threads` threads, and merged into
+    one score dictionary in the order they were given.
+
+    Parameters
+    ----------
+    files : list
+        paths of files in the format of `parse_score_file`, which are opened
+        on the pool's threads, or files that are already open
+
+    threads : int, optional
+        the most files read at the same time
+
+    Returns
+    -------
+    tuple : dictionary, list
+        the {routine: scores} of all of the files, and the (file, seconds) it
+        took to read and parse every file
+
+    Raises
+    ------
+    ValueError
+        if two files hold the same routine, or a file can't be parsed
+
+    '''
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(max(1, min(threads or 1, len(files) or 1)))
+    try:
+        parsed = pool.map(_read_score_file, files)
+    finally:
+        pool.close()
+        pool.join()
+    scores  = {} # the merged scores
+    sources = {} # the file every routine came from
+    latency = []
+    for name, routine, _scores, seconds in parsed:
+        if routine in scores:
+            raise ValueError('routine %s is in both %s and %s' %
+                             (routine, sources[routine], name))
+        scores[routine], sources[routine] = _scores, name
+        latency.append((name, seconds))
+    return scores, latency
+
+def _read_score_file(file):
+    ''' Thread side: reads one score file, timing it '''
+    import time
+    start = time.time()
+    name = file if isinstance(file, basestring) else getattr(file, 'name', '<file>')
+    try:
+        if isinstance(file, basestring):
+            with open(file) as opened:
+                routine, scores = parse_score_file(opened)
+        else:
+            routine, scores = parse_score_file(file)
+    except (IndexError, ValueError) as error:
+        raise ValueError('%s: bad score file (%s)' % (name, error))
+    return name, routine, scores, time.time() - start
+
+def parse_score_sheet(file):
+    ''' Parses an input file straight into a `ScoreSheet`
+
+    This reads the same format as `parse_input_file`, but puts the marks
+    straight into the sheet's marks buffer instead of building a dictionary
+    for every routine.
+
+    Parameters
+    ----------
+    file : file
+        the PROPERLY FORMATTED input file
+
+    Returns
+    -------
+    ScoreSheet
+        the routines, judges and marks of the file
+
+    '''
+    for _, sheet in iter_score_sheets(file):
+        return sheet
+    return ScoreSheet([], [])
+
+def iter_records(file):
+    ''' Reads the marks of a file one line at a time
+
+    A file can hold any number of events. An event starts with a header line
+    beginning with `#` (the rest of the line is its name, which can be empty),
+    followed by the line of judges and then a line per routine:
+
+        # Waltz
+                   <judge0> <judge1> ... <judgeN>
+        <routine0> <score0> <score1> ... <scoreN>
+        ...
+        # Tango
+        ...
+
+    A file without any `#` lines is a single event, so every file that
+    `parse_input_file` reads can be read here too. Only the current line is
+    ever held in memory, however long the file is.
+
+    Parameters
+    ----------
+    file : file
+        the PROPERLY FORMATTED input file, or any iterable of lines
+
+    Yields
+    ------
+    tuple : int, str, list, str, list
+        (event, name, judges, routine, marks) for every routine, where event
+        counts the events from 0 and judges is the same list for a whole event
+
+    Raises
+    ------
+    ValueError
+        if a routine's line does not have exactly one mark for every judge
+
+    '''
+    event, name, judges = -1, '', None
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if line.startswith('#'):
+            event, name, judges = event+1, line[1:].strip(), None
+            continue
+        line = line.split()
+        if not line: continue
+        if judges is None:
+            ## the first line of an event is its judges
+            event, judges = max(event, 0), line
+            continue
+        if len(line) != len(judges)+1:
+            raise ValueError('line %d: expected %d marks for routine %s, found %d' %
+                             (number, len(judges), line[0], len(line)-1))
+        yield (event, name, judges, line[0], [int(mark) for mark in line[1:]])
+
+def iter_score_sheets(file):
+    ''' Reads a file one event at a time, straight into `ScoreSheet`s
+
+    Parameters
+    ----------
+    file : file
+        the input file, in the format of `iter_records`
+
+    Yields
+    ------
+    tuple : str, ScoreSheet
+        the name and the routines, judges and marks of every event, in the order
+        of the file. Only the event being read is ever held in memory
+
+    '''
+    sheet, current = None, None
+    for event, name, judges, routine, marks in iter_records(file):
+        if event != current:
+            if sheet is not None: yield current_name, sheet
+            sheet, current, current_name = ScoreSheet([], judges), event, name
+        sheet.add_routine(routine, marks)
+    if sheet is not None: yield current_name, sheet
+
+def export_placements(scores, placements, reasons, file=None, format='csv'):
+	''' Writes the placements and their tally/sum cells to a file, row by row
+
+	Only one row is ever built at a time, so the memory used does not grow with
+	the size of the field. The formats are
+
+	csv: one row per routine and placement column, `place,routine,column,tally,sum`
+	jsonl: one JSON object per routine, with its marks and tally and sum lists
+	wide: one CSV row per routine, its marks then a `tally(sum)` cell per column
+
+	Routines are written in the order they placed.
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+		the scores that were placed
+
+	placements: dict
+		the {place: routine} placements
+
+	reasons: dict or CompactReasons
+		the reasons from `scoring.competition`
+
+	file: file, optional
+		where to write, any object with a `write` method. Defaults to stdout
+
+	format: str, optional
+		'csv', 'jsonl' or 'wide'
+
+	Returns
+	-------
+	int
+		the number of rows written
+
 	'''
-	pass
+	import csv, json, sys
+	if file is None: file = sys.stdout
+	if format not in ('csv', 'jsonl', 'wide'):
+		raise ValueError('unknown export format %r' % format)
+	if isinstance(scores, ScoreSheet):
+		judges = scores.judges
+		marks  = lambda routine: scores.row(routine)
+	else:
+		judges = sorted(scores.itervalues().next()) if scores else []
+		marks  = lambda routine: [scores[routine][judge] for judge in judges]
+	num_places = len(scores)
+	columns    = range(1, num_places+1)
+	writer     = csv.writer(file) if format != 'jsonl' else None
+	rows       = 0
+	if format == 'csv':
+		writer.writerow(['place', 'routine', 'column', 'tally', 'sum'])
+	elif format == 'wide':
+		writer.writerow(['place', 'routine'] + ['J%s' % judge for judge in judges] +
+		                ['1-%d' % column for column in columns])
+	for place in sorted(placements):
+		routine = placements[place]
+		if routine is None: continue
+		cells = reasons[routine]
+		if format == 'csv':
+			for column in columns:
+				cell = cells[column]
+				writer.writerow([place, routine, column, cell['tally'], cell['sum']])
+				rows += 1
+			continue
+		if format == 'wide':
+			writer.writerow([place, routine] + list(marks(routine)) +
+			                ['%d(%d)' % (cells[column]['tally'], cells[column]['sum'])
+			                 for column in columns])
+		else:
+			file.write(json.dumps({
+				'place'  : place,
+				'routine': routine,
+				'marks'  : dict(zip(judges, marks(routine))),
+				'tally'  : [cells[column]['tally'] for column in columns],
+				'sum'    : [cells[column]['sum']   for column in columns],
+			}, sort_keys=True) + '\n')
+		rows += 1
+	return rows
 
-def print_full_placements(scores, placements, reasons):
+def print_full_placements(scores, placements, reasons, file=None, format='text'):
 	''' Prints the placements
+
+	The table is written one routine at a time, to stdout or to `file`, as
+	'text', 'markdown' or 'html' (see `render`).
 	'''
-	judges       = scores.iteritems().next()[1].keys()
+	import sys
+	from render import Group, Layout, render
+	if file is None: file = sys.stdout
+	if isinstance(scores, ScoreSheet):
+		judges = scores.judges
+		marks  = lambda routine: scores.row(routine)
+	else:
+		judges = scores.iteritems().next()[1].keys()
+		marks  = lambda routine: scores[routine].values()
 	num_routines = len(scores)
 	num_judges   = len(judges)
 	majority     = (num_judges+1)/2
-	print 'Majoirty', majority
 	
 	
 	reverse_scores = {routine: place for place, routine in placements.iteritems()}
 
-	seprt  = '------------++'
-	seprt += '-'*(num_judges  *6-1)+'++'
-	seprt += '-'*(num_routines*6-1)+'++'
-	seprt += '----------\n'
-
-	seprt2  = '------------++'
-	seprt2 += '-----+'*(num_judges)+'+'
-	seprt2 += '-----+'*(num_routines)+'+'
-	seprt2 += '----------\n'
-
-	strng  = '            ||'
-	strng += str.center('Judge Placement',   num_judges  *6-1) + '||'
-	strng += str.center('Relative Placement',num_routines*6-1) + '||\n'
-	strng += seprt
-	strng += ' Routine ID ||'
-
-	for judge in judges:
-		strng += '  J%-2s|' % judge
-	strng += '|'
-
-	for i in placements:
-		strng += ' 1-%-2d|' % i
-	strng += '|Placements\n' + seprt2
-
-	for routine, _scores in scores.items():
-		# print the routine and it's score
-		strng += '%10s  ||' % routine
-		for _, score in _scores.iteritems():
-			strng += '%3s  |' % score
-		strng += '|'
-		# print the routine's relative placement count
-		for i in range(len(reasons[routine])):
-			count = str(reasons[routine][i+1]['tally'])
-			if reasons[routine][i+1]['tally'] is 0: count = '-----'
-			elif i is 0: count = str(reasons[routine][i+1]['tally'])
-			elif reasons[routine][i+1]['tally'] > majority: count = '---->'
-			strng += str.center(str(count), 5)+'|'
-		# print the final placements
-		strng += '|%5s\n' % reverse_scores[routine] + seprt2
-	print strng
+	layout = Layout([Group('',                   1,            12, '%10s  ', ' %s '),
+	                 Group('Judge Placement',    num_judges,   5,  '%3s  ',  '  %-3s'),
+	                 Group('Relative Placement', num_routines, 5,
+	                       lambda count: str.center(str(count), 5), ' %-4s'),
+	                 Group(None,                 1,            10, '%5s')])
+	headings = [['Routine ID'], ['J%s' % judge for judge in judges],
+	            ['1-%d' % i for i in placements], ['Placements']]
+
+	def rows():
+		for routine in scores:
+			# the routine's relative placement count
+			counts = []
+			for i in range(len(reasons[routine])):
+				tally = reasons[routine][i+1]['tally']
+				count = str(tally)
+				if tally == 0: count = '-----'
+				elif i == 0: count = str(tally)
+				elif tally > majority: count = '---->'
+				counts.append(count)
+			yield [[routine], marks(routine), counts, [reverse_scores[routine]]]
+	render(layout, headings, rows(), file, format)
+
+## anything but digits, or a space inside a number, in the joined marks
+_BAD_MARKS = re.compile(r'[^\d\s,]|\d\s+\d')
 
 def read_csv(file):
+	''' Reads a CSV export of one event into a `ScoreSheet`
+
+	The first row holds the judges (after a cell for the routine column, which
+	can say anything) and every other row is a routine and its marks, the same
+	layout as `parse_input_file`.
+	'''
+	return read_csv_files([file])[0][1]
+
+def read_csv_files(files):
+	''' Reads many CSV exports at once into `ScoreSheet`s
+
+	The files are checked as they are read: the header row once per file, and
+	after that only the length of every row. The marks of every file go into one
+	flat list of text, in the row order `ScoreSheet` keeps them in. That is
+	joined into one string, checked with one regular expression and parsed by
+	numpy in a single pass in C, and every file's sheet is then cut from that
+	buffer.
+
+	Parameters
+	----------
+	files: list
+		open CSV files, one event per file
+
+	Returns
+	-------
+	list
+		a (name, ScoreSheet) pair for every file, the name being the file's name
+
+	Raises
+	------
+	ValueError
+		if a file has no judges, repeats a judge or a routine, or has a row that
+		is not as long as its header
+
+	'''
 	import csv
-	reader = csv.reader(file)
-	for row in reader:
-		print row
+	from array import array
+	import numpy
+	cells  = [] # the marks of every file, as text, one after another
+	events = [] # (name, judges, routines, first cell) of every file
+	for file in files:
+		name   = getattr(file, 'name', '<csv>')
+		reader = csv.reader(file)
+		header = next(reader, [])
+		judges = [judge.strip() for judge in header[1:]]
+		if not judges or len(set(judges)) != len(judges):
+			raise ValueError('%s: bad header %r' % (name, header))
+		width    = len(header)
+		routines = []
+		seen     = set()
+		start    = len(cells)
+		for row in reader:
+			if not row or not ''.join(row).strip(): continue
+			if len(row) != width:
+				raise ValueError('%s, line %d: expected %d cells, found %d' %
+				                 (name, reader.line_num, width, len(row)))
+			routine = row[0].strip()
+			if routine in seen:
+				raise ValueError('%s, line %d: routine %s is already on the sheet' %
+				                 (name, reader.line_num, routine))
+			seen.add(routine)
+			routines.append(routine)
+			cells.extend(row[1:])
+		events.append((name, judges, routines, start))
+	text  = ','.join(cells)
+	marks = numpy.fromstring(text, numpy.int64, sep=',') if cells else numpy.zeros(0)
+	if (_BAD_MARKS.search(text) or len(marks) != len(cells) or
+	    (len(marks) and (marks.min() < 0 or marks.max() > 0xffff))):
+		## only now go cell by cell, to say which one is wrong
+		for name, judges, routines, start in events:
+			for cell in cells[start:start + len(judges)*len(routines)]:
+				if not cell.strip().isdigit() or int(cell) > 0xffff:
+					raise ValueError('bad mark in %s: %r' % (name, cell))
+	marks = array('H', marks.astype(numpy.uint16).tostring())
+	sheets = []
+	for name, judges, routines, start in events:
+		end = start + len(judges)*len(routines)
+		sheets.append((name, ScoreSheet(routines, judges, marks[start:end])))
+	return sheets
 
 
 
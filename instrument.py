@@ -0,0 +1,116 @@
+''' profiling hooks for the placement pipeline
+
+`scoring.competition` works in four steps: tally, majority placement, the sum tie
+break and the head judge tie break. Pass it a `Profile` to see where the time of
+an event goes
+
+    >>> profile = Profile()
+    >>> placements, reasons = competition(scores, '3', profile=profile)
+    >>> profile.report()
+    step          calls     seconds      cells
+    tally             1    0.000412        600
+    ...
+
+Without a profile (the default) the engines only ever test `profile is not None`,
+so leaving the hooks in costs nothing. One profile can be passed to any number
+of calls and adds them all up.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import sys
+import time
+from collections import defaultdict
+
+## the steps of `scoring.competition`, in the order they run
+STEPS = ('tally', 'majority', 'sum', 'head')
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class Profile(object):
+	''' Timers and counters for the steps of a placement
+
+	Attributes
+	----------
+	seconds: dict
+	the {step: seconds} spent in every step
+
+	calls: dict
+	the {step: times} every step was timed
+
+	cells: dict
+	the {step: cells} number of tally/sum table cells every step built or read
+
+	tie_groups: int
+	the number of groups of tied routines that had to be split
+
+	tied_routines: int
+	the number of routines in those groups
+
+	max_depth: int
+	the most columns a tie break went past the majority column, which is how
+	deep the old recursive tie breaker would have gone
+
+	max_work: int
+	the most groups that were waiting to be split at once
+
+	'''
+	def __init__(self):
+		self.seconds       = defaultdict(float)
+		self.calls         = defaultdict(int)
+		self.cells         = defaultdict(int)
+		self.tie_groups    = 0
+		self.tied_routines = 0
+		self.max_depth     = 0
+		self.max_work      = 0
+		self.__started     = {}
+
+	def start(self, step):
+		''' Starts the timer of a step
+		'''
+		self.__started[step] = timer()
+
+	def stop(self, step):
+		''' Stops the timer of a step and adds the time to its total
+		'''
+		self.seconds[step] += timer() - self.__started.pop(step)
+		self.calls[step]   += 1
+
+	def count(self, step, cells):
+		''' Adds to the number of table cells a step has looked at
+		'''
+		self.cells[step] += cells
+
+	def tie(self, size, depth, work):
+		''' Records the split of a tied group
+
+		Parameters
+		----------
+		size: int
+		the number of routines in the group
+
+		depth: int
+		the number of columns past the majority column the group is in
+
+		work: int
+		the number of groups still waiting to be split
+
+		'''
+		self.tie_groups    += 1
+		self.tied_routines += size
+		self.max_depth = max(self.max_depth, depth)
+		self.max_work  = max(self.max_work, work)
+
+	def report(self, file=sys.stdout):
+		''' Writes out a table of the timers and counters
+		'''
+		file.write('%-10s %8s %11s %10s\n' % ('step', 'calls', 'seconds', 'cells'))
+		steps = list(STEPS) + sorted(set(self.calls) - set(STEPS))
+		for step in steps:
+			file.write('%-10s %8d %11.6f %10d\n' % (step, self.calls[step],
+			           self.seconds[step], self.cells[step]))
+		file.write('tie groups %d (%d routines), depth %d, work list %d\n' %
+		           (self.tie_groups, self.tied_routines, self.max_depth,
+		            self.max_work))
@@ -0,0 +1,282 @@
+''' scoring helpers for use during a live event
+
+`scoring.competition` starts from nothing every time it is called. During an
+event the scores change a little at a time (a scrutineer fixes a mark) so the
+classes here keep the tally and sum tables around and only redo the parts of
+the placement that a change can affect.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import bisect
+
+from scoring import tally_table, resolve_ties, place_routines
+from score_sheet import ScoreSheet
+
+
+class IncrementalScorer(object):
+	''' Keeps a competition's placements up to date as marks are corrected
+
+	The scorer holds the same cumulative tally and sum tables as
+	`scoring.competition` and groups the routines by the column in which they
+	reached a majority. Changing one mark only touches the tally and sum cells
+	of that routine from the lower of the two marks onwards. Only the groups the
+	routine leaves and joins have their ties broken again; the groups in between
+	just move up or down a place.
+
+	>>> scorer = IncrementalScorer(scores, head_judge)
+	>>> scorer.update_mark('274283', '2', 3)
+	>>> placements, reasons = scorer.results()
+
+	Parameters
+	----------
+	scores: dict
+	the {routine: {judge: placement}} scores, which are copied
+
+	head_judge: hashable
+	the head judge
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	'''
+	def __init__(self, scores, head_judge, included=True):
+		if isinstance(scores, ScoreSheet):
+			scores = scores.to_dict()
+		self.scores     = dict((r, dict(marks)) for r, marks in scores.items())
+		self.head_judge = head_judge
+		self.included   = included
+		self.num_places = len(scores)
+		self.majority   = (len(scores.itervalues().next())+1) / 2
+		self.tallies, self.sums = tally_table(self.scores, self.num_places,
+		                                      None if included else head_judge)
+		self.columns    = {} # {routine: column it reached a majority in}
+		self.groups     = {} # {column: routines in the order they are placed}
+		self.placements = {}
+		for routine in self.scores:
+			column = self.__majority_column(routine)
+			self.columns[routine] = column
+			self.groups.setdefault(column, []).append(routine)
+		place = 1
+		for column in sorted(self.groups):
+			self.__resolve(column, place)
+			place += len(self.groups[column])
+
+	def update_mark(self, routine, judge, new_place):
+		''' Changes one judge's mark and re-places only what it affects
+
+		Parameters
+		----------
+		routine: hashable
+		the routine whose mark changed
+
+		judge: hashable
+		the judge who gave the mark
+
+		new_place: int
+		the corrected mark
+
+		'''
+		old_place = self.scores[routine][judge]
+		if old_place == new_place: return
+		self.scores[routine][judge] = new_place
+		if self.included or judge != self.head_judge:
+			self.__move_mark(routine, old_place, new_place)
+		old_column = self.columns[routine]
+		new_column = self.__majority_column(routine)
+		if new_column == old_column:
+			self.__resolve(old_column, self.__first_place(old_column))
+			return
+		self.columns[routine] = new_column
+		self.groups[old_column].remove(routine)
+		if not self.groups[old_column]: del self.groups[old_column]
+		self.groups.setdefault(new_column, []).append(routine)
+		## everything between the two columns moves by one place
+		low, high = min(old_column, new_column), max(old_column, new_column)
+		place = self.__first_place(low)
+		for column in sorted(c for c in self.groups if low <= c <= high):
+			if column in (old_column, new_column):
+				self.__resolve(column, place)
+			else:
+				for i, r in enumerate(self.groups[column]):
+					self.placements[place+i] = r
+			place += len(self.groups[column])
+
+	def results(self):
+		''' Returns the current `placements, reasons`, as `scoring.competition`
+		'''
+		reasons = {}
+		for routine in self.scores:
+			tally, sum = self.tallies[routine], self.sums[routine]
+			reasons[routine] = dict((place, {'tally': tally[place], 'sum': sum[place]})
+			                        for place in range(1, self.num_places+1))
+		return dict(self.placements), reasons
+
+	# the first column in which the routine has a majority
+	def __majority_column(self, routine):
+		return bisect.bisect_left(self.tallies[routine], self.majority)
+
+	# the first placement open to the routines that reached a majority in column
+	def __first_place(self, column):
+		return 1 + sum(len(g) for c, g in self.groups.items() if c < column)
+
+	# moves one counted mark in the routine's cumulative tables
+	def __move_mark(self, routine, old_place, new_place):
+		tally, sum = self.tallies[routine], self.sums[routine]
+		last = self.num_places+1
+		old_column = old_place if 0 < old_place < last else last
+		new_column = new_place if 0 < new_place < last else last
+		for place in range(min(old_column, new_column), last):
+			if place >= old_column:
+				tally[place] -= 1
+				sum[place]   -= old_place
+			if place >= new_column:
+				tally[place] += 1
+				sum[place]   += new_place
+
+	# breaks the ties in one group and writes out its placements
+	def __resolve(self, column, place):
+		group = self.groups[column]
+		if len(group) > 1:
+			placed = resolve_ties(group, place, column,
+			                      lambda r, c: self.tallies[r][c],
+			                      lambda r, c: self.sums[r][c],
+			                      lambda r: self.scores[r][self.head_judge],
+			                      self.num_places)
+			group[:] = [routine for _, routine in sorted(placed)]
+		for i, routine in enumerate(group):
+			self.placements[place+i] = routine
+
+
+class StreamingScorer(object):
+	''' Gives provisional results while the judges' sheets are coming in
+
+	Sheets are added one judge at a time, either directly with `add_sheet` or
+	by handing `stream` a generator or a queue of (judge, {routine: mark})
+	sheets. The running tally and sum tables are updated as each sheet arrives.
+
+	At any point `provisional` gives the placements as if the sheets received
+	so far were the whole panel, and `locked` gives the placements that can no
+	longer change, whatever the missing judges mark.
+
+	>>> scorer = StreamingScorer(routines, judges, head_judge)
+	>>> for placements, locked in scorer.stream(sheet_queue):
+	...     show(placements, locked)
+
+	Parameters
+	----------
+	routines: list
+	the routines being judged
+
+	judges: list
+	the whole panel of judges, including those who have not handed in yet
+
+	head_judge: hashable, optional
+	the head judge
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	'''
+	def __init__(self, routines, judges, head_judge=None, included=True):
+		self.routines   = list(routines)
+		self.judges     = list(judges)
+		self.head_judge = head_judge
+		self.included   = included
+		self.num_places = len(self.routines)
+		self.majority   = (len(self.judges)+1) / 2
+		self.sheets     = {} # {judge: {routine: mark}} received so far
+		self.tallies    = dict((r, [0]*(self.num_places+1)) for r in self.routines)
+		self.sums       = dict((r, [0]*(self.num_places+1)) for r in self.routines)
+
+	def add_sheet(self, judge, marks):
+		''' Adds one judge's {routine: mark} sheet to the running tables
+
+		A judge who hands in again is correcting their sheet, so the marks of
+		their earlier sheet are taken back out first.
+
+		Raises
+		------
+		ValueError
+		if the judge is not on the panel
+		'''
+		if judge not in self.judges:
+			raise ValueError('judge %s is not on the panel' % (judge,))
+		if judge in self.sheets:
+			self.__tally(judge, self.sheets[judge], -1)
+		self.sheets[judge] = dict(marks)
+		self.__tally(judge, self.sheets[judge], 1)
+
+	def stream(self, sheets):
+		''' Adds sheets as they arrive, yielding the results after each one
+
+		Parameters
+		----------
+		sheets: iterable or queue
+		(judge, {routine: mark}) sheets. A queue is read until it gives None
+
+		Returns
+		-------
+		generator
+		a (provisional placements, locked placements) pair after every sheet
+
+		'''
+		if hasattr(sheets, 'get'): sheets = iter(sheets.get, None)
+		for judge, marks in sheets:
+			self.add_sheet(judge, marks)
+			yield self.provisional(), self.locked()
+
+	def provisional(self):
+		''' The {place: routine} placements from the sheets received so far
+
+		These are the placements `scoring.competition` would give if the judges
+		who have handed in were the whole panel.
+		'''
+		if not self.sheets: return {}
+		head = self.sheets.get(self.head_judge, {})
+		return place_routines(self.routines, self.tallies, self.sums,
+		                      (len(self.sheets)+1) / 2, self.num_places,
+		                      lambda r: head.get(r, 0))
+
+	def locked(self):
+		''' The {place: routine} placements that can no longer change
+
+		Every missing judge could still mark a routine anywhere, so a routine's
+		final majority column lies somewhere between the column it would reach
+		if every missing mark were a 1st and the column it has already reached.
+		A routine is locked once every other routine is sure to reach its
+		majority in a strictly earlier or strictly later column, as then no tie
+		break can move it. Once every sheet is in, everything is locked.
+		'''
+		if len(self.sheets) == len(self.judges): return self.provisional()
+		missing = len([j for j in self.judges
+		               if j not in self.sheets and self.__counted(j)])
+		earliest = {}
+		latest   = {}
+		for routine in self.routines:
+			tally = self.tallies[routine]
+			earliest[routine] = bisect.bisect_left(tally, self.majority-missing, 1)
+			latest[routine]   = min(bisect.bisect_left(tally, self.majority),
+			                        self.num_places)
+		locked = {}
+		for routine in self.routines:
+			ahead  = len([r for r in self.routines if latest[r] < earliest[routine]])
+			behind = len([r for r in self.routines if latest[routine] < earliest[r]])
+			if ahead + behind == self.num_places-1:
+				locked[ahead+1] = routine
+		return locked
+
+	# are this judge's marks tallied?
+	def __counted(self, judge):
+		return self.included or judge != self.head_judge
+
+	# adds (sign 1) or takes back (sign -1) a sheet's marks in the tables
+	def __tally(self, judge, marks, sign):
+		if not self.__counted(judge): return
+		for routine, mark in marks.items():
+			if not 0 < mark <= self.num_places: continue
+			tally, sum = self.tallies[routine], self.sums[routine]
+			for place in range(mark, self.num_places+1):
+				tally[place] += sign
+				sum[place]   += sign*mark
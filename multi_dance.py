@@ -0,0 +1,177 @@
+''' combining the results of a multi-dance final
+
+A multi-dance final (Standard W/T/F/Q for example) places every dance on its own
+with `scoring.competition` and then combines them:
+
+    Rule 9: the couple with the lowest sum of places wins
+    Rule 10: couples tied on the sum of places, competing for place k, are split
+        by the number of dances they placed k-th or better in (more wins) and then
+        by the sum of those places (lower wins)
+    Rule 11: couples still tied are split by treating all the marks of all of the
+        dances as one dance, and placing them with the majority rule for place k
+
+Anything still tied after Rule 11 falls back to the head judge, as in
+`scoring.competition`, using the sum of the head judge's marks over the dances.
+
+The reasons table of every dance is kept from the first pass, and the Rule 10
+table and the combined "one dance" Rule 11 table are each built once from those,
+so no dance is ever scored twice.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+from scoring     import competition, tally_table
+from score_sheet import ScoreSheet
+
+
+class MultiDance(object):
+	''' Places a multi-dance final
+
+	>>> final = MultiDance([('W', waltz), ('T', tango), ('F', foxtrot)], '3')
+	>>> final.placements
+	{1: '274283', 2: '340278', ...}
+
+	Parameters
+	----------
+	dances: list
+	(dance, scores) pairs, one for every dance of the final
+
+	head_judge: hashable
+	the head judge
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	Attributes
+	----------
+	dance_placements: dict
+	the {dance: {place: routine}} placements of each dance
+
+	dance_reasons: dict
+	the {dance: reasons} tables of each dance, from `scoring.competition`
+
+	totals: dict
+	the {routine: sum of places} of Rule 9
+
+	placements: dict
+	the final {place: routine} placements
+
+	rules: dict
+	the {routine: rule} that decided each routine's place: 9, 10, 11 or 'head'
+
+	'''
+	def __init__(self, dances, head_judge, included=True):
+		self.dances     = [dance for dance, _ in dances]
+		self.scores     = dict(dances)
+		self.head_judge = head_judge
+		self.dance_placements = {}
+		self.dance_reasons    = {}
+		for dance, scores in dances:
+			placements, reasons = competition(scores, head_judge, included)
+			self.dance_placements[dance] = placements
+			self.dance_reasons[dance]    = reasons
+		routines = list(self.scores[self.dances[0]])
+		self.num_places = len(routines)
+		## {routine: {dance: place}}, the marks Rule 10 is tallied over
+		self.dance_places = dict((r, {}) for r in routines)
+		for dance, placements in self.dance_placements.items():
+			for place, routine in placements.items():
+				self.dance_places[routine][dance] = place
+		self.totals = dict((r, sum(places.values()))
+		                   for r, places in self.dance_places.items())
+		self.__rule10  = tally_table(self.dance_places, self.num_places)
+		self.__rule11  = None
+		self.rules      = {}
+		self.placements = {}
+		## Rule 9: rank on the sum of places, breaking ties as we go
+		place = 1
+		for total in sorted(set(self.totals.values())):
+			tied = [r for r in routines if self.totals[r] == total]
+			if len(tied) == 1:
+				self.rules[tied[0]] = 9
+			for routine in self.__break_tie(tied, place):
+				self.placements[place] = routine
+				place += 1
+
+	def combined_tables(self):
+		''' The tally and sum tables of all of the marks taken as one dance
+
+		These are the per dance tables added together, built on first use.
+
+		Returns
+		-------
+		tuple : dict, dict
+		the {routine: tallies} and {routine: sums} tables, indexed by placement
+
+		'''
+		if self.__rule11 is None:
+			tallies = {}
+			sums    = {}
+			for routine in self.dance_places:
+				tally = [0]*(self.num_places+1)
+				sum   = [0]*(self.num_places+1)
+				for reasons in self.dance_reasons.values():
+					for place, cell in reasons[routine].items():
+						tally[place] += cell['tally']
+						sum[place]   += cell['sum']
+				tallies[routine] = tally
+				sums[routine]    = sum
+			self.__rule11 = tallies, sums
+		return self.__rule11
+
+	# ranks a group tied on the sum of places, starting at place
+	def __break_tie(self, tied, place):
+		order = []
+		tied  = list(tied)
+		while len(tied) > 1:
+			winners = self.__apply_rule10(tied, place)
+			rule    = 10
+			if len(winners) > 1:
+				winners = self.__apply_rule11(winners, place)
+				rule    = 11
+			if len(winners) > 1:
+				winners = [min(winners, key=self.__head_total)]
+				rule    = 'head'
+			self.rules[winners[0]] = rule
+			order.append(winners[0])
+			tied.remove(winners[0])
+			place += 1
+		if tied and tied[0] not in self.rules:
+			self.rules[tied[0]] = self.rules[order[-1]]
+		return order + tied
+
+	# Rule 10: most dances placed `place` or better, then the lowest sum of those
+	def __apply_rule10(self, tied, place):
+		tallies, sums = self.__rule10
+		column = min(place, self.num_places)
+		best   = max(tallies[r][column] for r in tied)
+		tied   = [r for r in tied if tallies[r][column] == best]
+		best   = min(sums[r][column] for r in tied)
+		return [r for r in tied if sums[r][column] == best]
+
+	# Rule 11: the majority rule over every mark of every dance, from `place` on
+	def __apply_rule11(self, tied, place):
+		tallies, sums = self.combined_tables()
+		num_marks = tallies[tied[0]][self.num_places]
+		majority  = num_marks / 2 + 1
+		for column in range(place, self.num_places+1):
+			majorities = [r for r in tied if tallies[r][column] >= majority]
+			if not majorities: continue
+			best = max(tallies[r][column] for r in majorities)
+			tied = [r for r in majorities if tallies[r][column] == best]
+			best = min(sums[r][column] for r in tied)
+			tied = [r for r in tied if sums[r][column] == best]
+			if len(tied) == 1: break
+		return tied
+
+	# the sum of the head judge's marks over every dance
+	def __head_total(self, routine):
+		total = 0
+		for dance in self.dances:
+			scores = self.scores[dance]
+			if isinstance(scores, ScoreSheet):
+				total += scores.mark(routine, self.head_judge)
+			else:
+				total += scores[routine][self.head_judge]
+		return total
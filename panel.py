@@ -0,0 +1,141 @@
+''' leave-one-judge-out analysis of a panel
+
+When a couple complains about a judge, the question is whether that judge made a
+difference. `leave_out` answers it for every judge of the panel at once: each
+judge's marks are taken out and the field is placed again
+
+    >>> changed = judge_influence(scores, '3')
+    >>> changed
+    {('5',): {'274283': (2, 1), '340278': (1, 2)}}
+
+says that without judge 5 the top two couples would have swapped, and that no
+other judge changed a placement on their own. Passing `k=2` tries every pair of
+judges instead, and so on.
+
+Nothing is scored from scratch. The cumulative tally and sum tables of the full
+panel are built once, every judge's own contribution to them is a table of its
+own, and the tables of a reduced panel are the full tables less the
+contributions of the judges taken out. The reduced panels are then placed
+together, as the events of one `batch.batch_place` call.
+
+The head judge keeps breaking the final ties even when their own marks are
+taken out of the tallies, as when they are not included in the tally of
+`scoring.competition`.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import itertools
+
+import numpy as np
+
+from batch       import batch_tally, batch_place
+from score_sheet import ScoreSheet
+
+
+def judge_tables(marks):
+	''' Every judge's own contribution to the cumulative tables
+
+	Parameters
+	----------
+	marks: ndarray
+	the (routines x judges) marks
+
+	Returns
+	-------
+	tuple : ndarray, ndarray
+	the (judges x routines x places+1) tally and sum tables of every judge on
+	their own, so that the tables of the whole panel are their sum over judges
+
+	'''
+	marks  = np.asarray(marks).astype(np.int64)
+	R, J   = marks.shape
+	places = np.arange(R+1)
+	given  = (marks > 0) & (marks <= R)
+	## a judge's tally of a routine is 1 from the place they gave it onwards
+	tallies = ((marks.T[:, :, None] <= places) & given.T[:, :, None]).astype(np.int64)
+	return tallies, tallies*marks.T[:, :, None]
+
+def leave_out(scores, head_judge, k=1, included=True):
+	''' Places the field without every k judges of the panel
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the {routine: {judge: placement}} scores
+
+	head_judge: hashable
+	the head judge
+
+	k: int, optional
+	the number of judges taken out at a time; every k-subset of the panel is
+	tried
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	Returns
+	-------
+	tuple : dict, list
+	the {place: routine} placements of the full panel, and a list of (judges,
+	placements) pairs for every subset of k judges taken out
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	marks = scores.as_array()
+	R, J  = marks.shape
+	head  = scores.judge_index.get(head_judge, -1)
+	subsets = np.array(list(itertools.combinations(range(J), k)),
+	                   dtype=np.intp).reshape(-1, k)
+	## the full panel's tables, and what every judge adds to them
+	full_tallies, full_sums = batch_tally(marks[None], np.array([head]), included)
+	tallies, sums = judge_tables(marks)
+	if head >= 0 and not included:
+		tallies[head] = 0
+		sums[head]    = 0
+	## row 0 is the full panel, the rest are the reduced panels
+	tallies = np.concatenate((full_tallies, full_tallies - tallies[subsets].sum(axis=1)))
+	sums    = np.concatenate((full_sums,    full_sums    - sums[subsets].sum(axis=1)))
+	E = len(subsets) + 1
+	majority   = np.array([(J+1)//2] + [(J-k+1)//2]*(E-1))
+	head_marks = np.broadcast_to(marks[:, head] if head >= 0 else np.zeros(R), (E, R))
+	places = batch_place(tallies, sums, majority, np.full(E, R), head_marks)
+	placements = [dict((int(places[e, r]), routine)
+	                   for r, routine in enumerate(scores.routines)) for e in range(E)]
+	return placements[0], [(tuple(scores.judges[j] for j in subset), placements[e+1])
+	                       for e, subset in enumerate(subsets)]
+
+def judge_influence(scores, head_judge, k=1, included=True):
+	''' Finds the judges whose removal would change a placement
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the {routine: {judge: placement}} scores
+
+	head_judge: hashable
+	the head judge
+
+	k: int, optional
+	the number of judges taken out at a time
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	Returns
+	-------
+	dict
+	{judges: {routine: (place, place without them)}} for every subset of k
+	judges that changes at least one placement, listing the routines that move
+
+	'''
+	placements, reduced = leave_out(scores, head_judge, k, included)
+	places  = dict((routine, place) for place, routine in placements.items())
+	changed = {}
+	for judges, without in reduced:
+		moved = dict((routine, (places[routine], place))
+		             for place, routine in without.items() if places[routine] != place)
+		if moved: changed[judges] = moved
+	return changed
@@ -0,0 +1,138 @@
+''' scoring a full competition program on more than one core
+
+Re-running a whole competition after a mark correction means scoring every dance
+of every round again. Each of those events is independent, so `score_program`
+fans them out to a pool of worker processes
+
+    >>> events  = [(scores, head_judge, True) for scores in program]
+    >>> results = score_program(events, workers=4)
+
+Events are not sent to the workers as pickled dictionaries. Each one is packed
+into a small payload of its routine and judge labels plus the flat `array('H')`
+of marks of its `ScoreSheet`, and the workers send back the placement order and
+flat tally/sum tables. The results come back in the same order as the events, and are exactly what
+`scoring.competition` returns for each event when run one after another.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import multiprocessing
+from array import array
+
+from scoring     import competition
+from score_sheet import ScoreSheet
+
+
+def pack_event(scores, head_judge, included=True):
+	''' Packs an event into a compact payload for a worker process
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the {routine: {judge: placement}} scores of the event
+
+	head_judge: hashable
+	the head judge of the event
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	Returns
+	-------
+	tuple
+	(routines, judges, marks, head, included) where marks is the routines x
+	judges marks as the bytes of an `array('H')` and head is the index of the
+	head judge in judges (-1 if they did not judge the event)
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	routines = tuple(scores.routines)
+	judges   = tuple(scores.judges)
+	head     = scores.judge_index.get(head_judge, -1)
+	return routines, judges, _tobytes(scores.marks), head, included
+
+def _tobytes(marks):
+	return marks.tobytes() if hasattr(marks, 'tobytes') else marks.tostring()
+
+def _unpack_scores(routines, judges, marks):
+	''' Rebuilds the score sheet from a packed payload '''
+	flat = array('H')
+	if hasattr(flat, 'frombytes'): flat.frombytes(marks)
+	else:                          flat.fromstring(marks)
+	return ScoreSheet(routines, judges, flat)
+
+def _score_payload(payload):
+	''' Worker side: scores one packed event and packs up the result
+
+	Returns
+	-------
+	tuple : array, array, array
+	the routine index at every placement (-1 if it was left empty), and the flat
+	routines x places tally and sum tables
+
+	'''
+	routines, judges, marks, head, included = payload
+	scores     = _unpack_scores(routines, judges, marks)
+	head_judge = judges[head] if head >= 0 else None
+	placements, reasons = competition(scores, head_judge, included)
+	index = dict((routine, r) for r, routine in enumerate(routines))
+	order = array('l', [index.get(placements[place], -1)
+	                    for place in range(1, len(routines)+1)])
+	tallies = array('l')
+	sums    = array('l')
+	for routine in routines:
+		for place in range(1, len(routines)+1):
+			tallies.append(reasons[routine][place]['tally'])
+			sums.append(   reasons[routine][place]['sum'])
+	return order, tallies, sums
+
+def _unpack_result(routines, result):
+	''' Turns a worker's packed result back into `placements, reasons` '''
+	order, tallies, sums = result
+	num_routines = len(routines)
+	placements = {}
+	for place, r in enumerate(order):
+		placements[place+1] = routines[r] if r >= 0 else None
+	reasons = {}
+	for r, routine in enumerate(routines):
+		reasons[routine] = {}
+		for place in range(1, num_routines+1):
+			cell = r*num_routines + place-1
+			reasons[routine][place] = {'tally': tallies[cell], 'sum': sums[cell]}
+	return placements, reasons
+
+def score_program(events, workers=None, chunksize=1):
+	''' Scores a list of events on a pool of worker processes
+
+	Parameters
+	----------
+	events: list
+	a list of (scores, head_judge, included) tuples, one per event
+
+	workers: int, optional
+	the number of worker processes. Defaults to the number of CPUs; with 1
+	worker the events are scored in this process
+
+	chunksize: int, optional
+	the number of events handed to a worker at a time
+
+	Returns
+	-------
+	list
+	the `placements, reasons` of every event, in the same order as `events`
+
+	'''
+	payloads = [pack_event(*event) for event in events]
+	if workers == 1 or len(payloads) < 2:
+		results = [_score_payload(payload) for payload in payloads]
+	else:
+		pool = multiprocessing.Pool(workers)
+		try:
+			results = list(pool.imap(_score_payload, payloads, chunksize))
+		finally:
+			pool.close()
+			pool.join()
+	return [_unpack_result(payload[0], result)
+	        for payload, result in zip(payloads, results)]
@@ -0,0 +1,118 @@
+''' a compact reasons table for `scoring.competition`
+
+The reasons table `competition` returns is a dictionary of dictionaries of
+dictionaries
+
+    reasons[routine][place] = {'tally': ..., 'sum': ...}
+
+which is three Python objects for every cell of a routines x places table, most
+of which nobody ever looks at. `CompactReasons` keeps only the columns each
+routine's placement actually used (from column 1 up to its "decisive" column:
+the column it reached a majority in, or the last column a tie break looked at)
+in two flat integer arrays.
+
+Indexing it still gives the old shape, built on demand, so `print_full_placements`
+and everything else that reads `reasons[routine][place]['tally']` keeps working.
+Cells past a routine's decisive column are worked out from its marks when they
+are asked for.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+try:
+	from collections.abc import Mapping
+except ImportError:
+	from collections import Mapping
+from array import array
+
+
+class CompactReasons(Mapping):
+	''' The tally and sum cells that decided each routine's placement
+
+	Parameters
+	----------
+	sheet: ScoreSheet
+	the marks that were scored
+
+	decisive: dict
+	the {routine: decisive column} of every routine
+
+	tallies: dict
+	the {routine: tallies} table, indexed by placement (see `tally_table`)
+
+	sums: dict
+	the {routine: sums} table, indexed by placement
+
+	head_judge: hashable, optional
+	a judge whose marks were left out of the tables
+
+	'''
+	__slots__ = ('sheet', 'head', 'num_places', 'offsets', 'tallies', 'sums')
+
+	def __init__(self, sheet, decisive, tallies, sums, head_judge=None):
+		self.sheet      = sheet
+		self.head       = sheet.judge_index.get(head_judge, -1)
+		self.num_places = len(sheet)
+		self.offsets    = array('l', [0])
+		self.tallies    = array('H')
+		self.sums       = array('l')
+		for routine in sheet.routines:
+			column = min(decisive[routine], self.num_places)
+			self.tallies.extend(tallies[routine][1:column+1])
+			self.sums.extend(   sums[routine][1:column+1])
+			self.offsets.append(len(self.tallies))
+
+	def decisive(self, routine):
+		''' The last column that was used to place the routine
+		'''
+		r = self.sheet.routine_index[routine]
+		return self.offsets[r+1] - self.offsets[r]
+
+	def cell(self, routine, place):
+		''' The (tally, sum) of a routine at a placement
+		'''
+		r = self.sheet.routine_index[routine]
+		start, end = self.offsets[r], self.offsets[r+1]
+		if place <= end - start:
+			return self.tallies[start+place-1], self.sums[start+place-1]
+		tally, sum = 0, 0
+		for j, mark in enumerate(self.sheet.row(routine)):
+			if 0 < mark <= place and j != self.head:
+				tally += 1
+				sum   += mark
+		return tally, sum
+
+	def to_dict(self):
+		''' The full reasons table, in the shape `competition` used to return
+		'''
+		return dict((routine, dict(row.items())) for routine, row in self.items())
+
+	def __getitem__(self, routine):
+		if routine not in self.sheet: raise KeyError(routine)
+		return _ReasonsRow(self, routine)
+
+	def __iter__(self):
+		return iter(self.sheet.routines)
+
+	def __len__(self):
+		return len(self.sheet)
+
+class _ReasonsRow(Mapping):
+	''' A view of one routine's reasons, {place: {'tally': .., 'sum': ..}} '''
+	__slots__ = ('reasons', 'routine')
+
+	def __init__(self, reasons, routine):
+		self.reasons = reasons
+		self.routine = routine
+
+	def __getitem__(self, place):
+		if not 1 <= place <= self.reasons.num_places: raise KeyError(place)
+		tally, sum = self.reasons.cell(self.routine, place)
+		return {'tally': tally, 'sum': sum}
+
+	def __iter__(self):
+		return iter(range(1, self.reasons.num_places+1))
+
+	def __len__(self):
+		return self.reasons.num_places
@@ -0,0 +1,232 @@
+''' a shared table renderer for the placement print-outs
+
+`input_output.print_full_placements` and `Relative_Placements.pprint` print the
+same kind of table: a routine column, a group of judge columns, a group of
+relative placement columns and the final placement
+
+                ||    Judge Placement     ||        Relative Placement         ||
+    ------------++------------------------++-----------------------------------++------
+     Routine ID ||  J1 |  J2 |  J3 |  J4 |...
+
+Both describe the table as a `Layout` of column `Group`s and hand the renderer
+the headings and then the rows one at a time, each row being a list of the
+cells of every group. The same rows can be written as
+
+    text      the monospace table above
+    markdown  a GitHub style pipe table
+    html      a <table> with a <thead> for the group titles and headings
+
+The separator lines and the shape of every row are worked out once per layout
+and reused for every table with that layout, and rows go out through a
+`BufferedWriter`, so only the current row (and a small write buffer) is ever in
+memory.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import sys
+try:
+	from html import escape
+except ImportError:
+	from cgi import escape
+
+
+class Group(object):
+	''' A group of columns of a table
+
+	Parameters
+	----------
+	title: str
+	the title over the whole group, or None to leave the title line short
+
+	size: int
+	the number of columns in the group
+
+	width: int
+	the width of every column in the text table
+
+	cell: str or function, optional
+	how a cell's value is written in the text table, a format string or a
+	function of the value
+
+	heading: str or function, optional
+	how a column heading is written in the text table
+
+	'''
+	__slots__ = ('title', 'size', 'width', 'cell', 'heading')
+
+	def __init__(self, title, size, width, cell='%s', heading='%s'):
+		self.title   = title
+		self.size    = size
+		self.width   = width
+		self.cell    = cell
+		self.heading = heading
+
+	def key(self):
+		return (self.title, self.size, self.width)
+
+def _formatter(format):
+	if callable(format): return format
+	return lambda value: format % (value,)
+
+class Layout(object):
+	''' The column groups of a table
+
+	Parameters
+	----------
+	groups: list
+	the `Group`s of the table, left to right
+
+	'''
+	def __init__(self, groups):
+		self.groups = list(groups)
+
+	def key(self):
+		return tuple(group.key() for group in self.groups)
+
+## the text separator lines of every layout seen so far
+_lines = {}
+
+def _text_lines(layout):
+	''' The title line and the two separator lines of a layout, worked out once '''
+	key = layout.key()
+	if key not in _lines:
+		groups = layout.groups
+		widths = [group.size*(group.width+1) - 1 for group in groups]
+		titles = [str.center(group.title, width) if group.title is not None else ''
+		          for group, width in zip(groups, widths)]
+		_lines[key] = ('||'.join(titles) + '\n',
+		               '++'.join('-'*width for width in widths) + '\n',
+		               '++'.join('+'.join(['-'*group.width]*group.size)
+		                         for group in groups) + '\n')
+	return _lines[key]
+
+class BufferedWriter(object):
+	''' Collects small writes and passes them on to a file in large ones
+
+	Parameters
+	----------
+	file: file
+	the file to write to
+
+	size: int, optional
+	the number of characters kept before they are written
+
+	'''
+	def __init__(self, file, size=1 << 16):
+		self.file   = file
+		self.size   = size
+		self.parts  = []
+		self.length = 0
+
+	def write(self, text):
+		self.parts.append(text)
+		self.length += len(text)
+		if self.length >= self.size: self.flush()
+
+	def flush(self):
+		if self.parts:
+			self.file.write(''.join(self.parts))
+		self.parts  = []
+		self.length = 0
+
+class TextTable(object):
+	''' Writes a layout as a monospace text table '''
+	def __init__(self, layout, file):
+		self.layout = layout
+		self.file   = file
+		self.title, self.rule, self.row_rule = _text_lines(layout)
+		self.cells    = [_formatter(group.cell)    for group in layout.groups]
+		self.headings = [_formatter(group.heading) for group in layout.groups]
+
+	def __line(self, formats, groups):
+		return '||'.join('|'.join([format(value) for value in values])
+		                 for format, values in zip(formats, groups)) + '\n'
+
+	def header(self, headings):
+		self.file.write(self.title + self.rule +
+		                self.__line(self.headings, headings) + self.row_rule)
+
+	def row(self, groups):
+		self.file.write(self.__line(self.cells, groups) + self.row_rule)
+
+	def footer(self):
+		self.file.write('\n')
+
+class MarkdownTable(object):
+	''' Writes a layout as a Markdown pipe table '''
+	def __init__(self, layout, file):
+		self.layout = layout
+		self.file   = file
+
+	def __line(self, groups):
+		return '| ' + ' | '.join(str(value).strip().replace('|', '\\|')
+		                         for values in groups for value in values) + ' |\n'
+
+	def header(self, headings):
+		columns = sum(group.size for group in self.layout.groups)
+		self.file.write(self.__line(headings) + '|' + '---|'*columns + '\n')
+
+	def row(self, groups):
+		self.file.write(self.__line(groups))
+
+	def footer(self):
+		self.file.write('\n')
+
+class HtmlTable(object):
+	''' Writes a layout as an HTML table '''
+	def __init__(self, layout, file):
+		self.layout = layout
+		self.file   = file
+
+	def __line(self, tag, groups):
+		return '<tr>' + ''.join('<%s>%s</%s>' % (tag, escape(str(value).strip()), tag)
+		                        for values in groups for value in values) + '</tr>\n'
+
+	def header(self, headings):
+		titles = ''.join('<th colspan="%d">%s</th>' %
+		                 (group.size, escape(group.title or ''))
+		                 for group in self.layout.groups)
+		self.file.write('<table>\n<thead>\n<tr>' + titles + '</tr>\n' +
+		                self.__line('th', headings) + '</thead>\n<tbody>\n')
+
+	def row(self, groups):
+		self.file.write(self.__line('td', groups))
+
+	def footer(self):
+		self.file.write('</tbody>\n</table>\n')
+
+FORMATS = {'text': TextTable, 'markdown': MarkdownTable, 'html': HtmlTable}
+
+def render(layout, headings, rows, file=None, format='text'):
+	''' Writes a table, one row at a time
+
+	Parameters
+	----------
+	layout: Layout
+	the column groups of the table
+
+	headings: list
+	the column headings of every group
+
+	rows: iterable
+	the rows, each a list of the cell values of every group. A generator is
+	never held in memory
+
+	file: file, optional
+	where to write. Defaults to stdout
+
+	format: str, optional
+	'text', 'markdown' or 'html'
+
+	'''
+	if format not in FORMATS:
+		raise ValueError('unknown table format %r' % format)
+	writer = BufferedWriter(sys.stdout if file is None else file)
+	table  = FORMATS[format](layout, writer)
+	table.header(headings)
+	for row in rows:
+		table.row(row)
+	table.footer()
+	writer.flush()
@@ -0,0 +1,143 @@
+''' a compact, array backed container for a competition's marks
+
+Every engine started out taking scores as a dictionary of dictionaries
+
+    {routine: {judge: placement}}
+
+which costs a dictionary per routine and a hash lookup on every mark. A
+`ScoreSheet` keeps the routines and judges in two lists (with index maps for
+the odd lookup by name) and all of the marks in one contiguous `array('H')`,
+row by row:
+
+    marks[routine_index*num_judges + judge_index] = placement
+
+`scoring.competition`, `scoring.tally_table` and `batch.stack_scores` work on the
+marks buffer directly. Old style dictionaries can be turned into a sheet with
+`ScoreSheet.from_dict` and back with `to_dict`.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+from array import array
+
+
+class ScoreSheet(object):
+	''' The marks of one competition
+
+	Parameters
+	----------
+	routines: list
+	the routines, in the order of the rows of marks
+
+	judges: list
+	the judges, in the order of the columns of marks
+
+	marks: iterable, optional
+	the routines x judges marks, row by row. Defaults to all 0 (no mark)
+
+	Raises
+	------
+	ValueError
+	if a routine or a judge is listed twice, or there are not routines x judges
+	marks
+
+	'''
+	__slots__ = ('routines', 'judges', 'routine_index', 'judge_index', 'marks')
+
+	def __init__(self, routines, judges, marks=None):
+		self.routines      = list(routines)
+		self.judges        = list(judges)
+		self.routine_index = dict((r, i) for i, r in enumerate(self.routines))
+		self.judge_index   = dict((j, i) for i, j in enumerate(self.judges))
+		for kind, labels, index in (('routine', self.routines, self.routine_index),
+		                            ('judge',   self.judges,   self.judge_index)):
+			if len(index) != len(labels):
+				repeated = [l for i, l in enumerate(labels) if index[l] != i][0]
+				raise ValueError('%s %s is on the sheet more than once' %
+				                 (kind, repeated))
+		if marks is None:
+			marks = array('H', [0])*(len(self.routines)*len(self.judges))
+		elif not isinstance(marks, array) or marks.typecode != 'H':
+			marks = array('H', marks)
+		if len(marks) != len(self.routines)*len(self.judges):
+			raise ValueError('expected %d marks, got %d' %
+			                 (len(self.routines)*len(self.judges), len(marks)))
+		self.marks = marks
+
+	@classmethod
+	def from_dict(cls, scores):
+		''' Builds a sheet from a {routine: {judge: placement}} dictionary
+
+		The judges are every judge that marked any routine, so a routine that
+		is missing a judge's mark gets a 0 (no mark) for it.
+		'''
+		routines = list(scores)
+		judges   = []
+		seen     = set()
+		for routine in routines:
+			for judge in scores[routine]:
+				if judge not in seen:
+					seen.add(judge)
+					judges.append(judge)
+		return cls(routines, judges,
+		           array('H', [scores[r].get(j, 0) for r in routines for j in judges]))
+
+	def to_dict(self):
+		''' Returns the marks as a {routine: {judge: placement}} dictionary
+		'''
+		return dict((routine, dict(zip(self.judges, self.row(routine))))
+		            for routine in self.routines)
+
+	def __len__(self):
+		return len(self.routines)
+
+	def __iter__(self):
+		return iter(self.routines)
+
+	def __contains__(self, routine):
+		return routine in self.routine_index
+
+	def __eq__(self, other):
+		return (isinstance(other, ScoreSheet) and self.routines == other.routines
+		        and self.judges == other.judges and self.marks == other.marks)
+
+	def __ne__(self, other):
+		return not self == other
+
+	def row(self, routine):
+		''' The marks of one routine, in the order of the judges
+		'''
+		start = self.routine_index[routine]*len(self.judges)
+		return self.marks[start:start+len(self.judges)]
+
+	def mark(self, routine, judge):
+		''' The mark one judge gave one routine
+		'''
+		return self.marks[self.routine_index[routine]*len(self.judges) +
+		                  self.judge_index[judge]]
+
+	def set_mark(self, routine, judge, mark):
+		''' Changes the mark one judge gave one routine
+		'''
+		self.marks[self.routine_index[routine]*len(self.judges) +
+		           self.judge_index[judge]] = mark
+
+	def add_routine(self, routine, marks):
+		''' Appends a routine and its marks, given in the order of the judges
+		'''
+		if len(marks) != len(self.judges):
+			raise ValueError('expected %d marks for routine %s, got %d' %
+			                 (len(self.judges), routine, len(marks)))
+		if routine in self.routine_index:
+			raise ValueError('routine %s is already on the sheet' % routine)
+		self.routine_index[routine] = len(self.routines)
+		self.routines.append(routine)
+		self.marks.extend(marks)
+
+	def as_array(self):
+		''' A (routines x judges) NumPy view of the marks, without copying
+		'''
+		import numpy as np
+		return np.frombuffer(self.marks, dtype=np.uint16).reshape(
+			len(self.routines), len(self.judges))
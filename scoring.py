@@ -56,6 +56,13 @@ names, etc.
 __author__  = 'Brooks MacBeth'
 __version__ = '1.0.0'
 
+import bisect
+import heapq
+import itertools
+
+from score_sheet import ScoreSheet
+from reasons     import CompactReasons
+
 
 def sum_placements(scores, routine, placement, head_judge=None):
 	''' Sums the number of times the routine recieved up to the given placement
@@ -87,7 +94,7 @@ def sum_placements(scores, routine, placement, head_judge=None):
 	sum = 0
 	judges_placements = scores[routine]
 	for judge in judges_placements:
-		if judges_placements[judge] <= placement and not judge is head_judge:
+		if judges_placements[judge] <= placement and judge != head_judge:
 			sum += judges_placements[judge]
 	return sum
 
@@ -119,42 +126,291 @@ def count_placements(scores, routine, placement, head_judge=None):
 	tally = 0
 	judges_placements = scores[routine]
 	for judge in judges_placements:
-		if judges_placements[judge] <= placement and not judge is head_judge:
+		if judges_placements[judge] <= placement and judge != head_judge:
 			tally += 1
 	return tally
 
+def tally_table(scores, num_places, head_judge=None):
+	''' Builds the cumulative tally and sum tables for every routine at once
+
+	Rather than rescanning a routine's marks once per placement (as
+	`count_placements` and `sum_placements` do), this makes one pass over the
+	marks to build a routines x places histogram and then takes a running
+	(prefix) sum along each row. The result is the same numbers as calling
+	`count_placements` and `sum_placements` for every placement.
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the scores over which we are counting
+
+	num_places: int
+	the number of placement columns to build
+
+	head_judge: hashable, optional
+	a judge whose marks are left out of the tables
+
+	Returns
+	-------
+	tuple : dict, dict
+	the {routine: tallies} and {routine: sums} tables, where each entry is a
+	list indexed by placement, so `tallies[routine][place]` is the number of
+	marks less than or equal to `place`. Index 0 is always 0
+
+	'''
+	tallies = {}
+	sums    = {}
+	if isinstance(scores, ScoreSheet):
+		## straight off the marks buffer, skipping the head judge by index
+		num_judges = len(scores.judges)
+		head = scores.judge_index.get(head_judge, -1)
+		rows = ((routine, scores.marks[r*num_judges:(r+1)*num_judges])
+		        for r, routine in enumerate(scores.routines))
+	else:
+		head = -1
+		rows = ((routine, [mark for judge, mark in judges_placements.items()
+		                   if judge != head_judge])
+		        for routine, judges_placements in scores.items())
+	for routine, marks in rows:
+		tally = [0]*(num_places+1)
+		sum   = [0]*(num_places+1)
+		## histogram of this routine's marks
+		for j, mark in enumerate(marks):
+			if 0 < mark <= num_places and j != head:
+				tally[mark] += 1
+				sum[mark]   += mark
+		## running totals turn the histogram into the cumulative tables
+		for place in range(1, num_places+1):
+			tally[place] += tally[place-1]
+			sum[place]   += sum[place-1]
+		tallies[routine] = tally
+		sums[routine]    = sum
+	return tallies, sums
+
+
+def resolve_ties(routines, place, column, tally, sum, head_mark, num_places,
+                 profile=None):
+	''' Breaks a tie between routines that reached a majority in the same column
+
+	The tie is broken with the usual cascade: the lowest sum of the marks in the
+	column wins; routines still tied on the sum go to the next column, where the
+	highest tally wins and the rest are ranked by their sum in that column, and
+	so on. Routines still tied after the last column are ranked by the head
+	judge's marks.
+
+	Rather than recursing for every split, the groups that still need breaking
+	are kept on a work list, so the stack stays flat and every routine is held
+	in exactly one group at a time however large the field is.
+
+	Parameters
+	----------
+	routines: list
+	the tied routines
+
+	place: int
+	the first placement the tied routines are competing for
+
+	column: int
+	the column in which they reached a majority
+
+	tally: function
+	`tally(routine, column)` gives the routine's tally in that column
+
+	sum: function
+	`sum(routine, column)` gives the routine's sum in that column
+
+	head_mark: function
+	`head_mark(routine)` gives the head judge's mark for the routine
+
+	num_places: int
+	the number of columns; ties still standing here go to the head judge
+
+	profile: instrument.Profile, optional
+	if given, the time spent on the sum and head judge steps and the tie groups
+	are recorded in it
+
+	Returns
+	-------
+	list
+	a list of (placement, routine) pairs, one for every tied routine
+
+	'''
+	placed = []
+	first  = column
+	work   = [(list(routines), place, column, 'sum')]
+	if profile is not None: profile.start('sum')
+	while work:
+		routines, place, column, i = work.pop()
+		if len(routines) == 0: continue
+		if len(routines) == 1:
+			placed.append((place, routines[0]))
+			continue
+		if profile is not None:
+			profile.tie(len(routines), column - first, len(work)+1)
+		if column >= num_places:
+			if profile is not None:
+				profile.stop('sum')
+				profile.start('head')
+			for routine in sorted(routines, key=head_mark):
+				placed.append((place, routine))
+				place += 1
+			if profile is not None:
+				profile.stop('head')
+				profile.start('sum')
+			continue
+		value  = tally if i == 'tally' else sum
+		values = [value(r, column) for r in routines]
+		if profile is not None: profile.count('sum', len(values))
+		best   = (min if i == 'sum' else max)(values)
+		new_routines = [r for r, v in zip(routines, values) if v == best]
+		routines     = [r for r, v in zip(routines, values) if v != best]
+		## the rest wait on the stack while the winners are sorted out
+		work.append((routines, place+len(new_routines), column, 'sum'))
+		work.append((new_routines, place, column+1, 'tally'))
+	if profile is not None: profile.stop('sum')
+	return placed
+
+def count_recalls(scores, head_judge=None):
+	''' Counts the recall (X) marks of every routine in one pass
+
+	A mark counts as a recall if it is an 'X' (either case) or any non-zero
+	number, so sheets can use either X marks or 1/0.
+
+	Parameters
+	----------
+	scores: dict
+	a dictionary of {routine: {judge: mark}} recall marks
+
+	head_judge: hashable, optional
+	a judge whose marks are not counted
+
+	Returns
+	-------
+	dict
+	the {routine: recalls} counts
+
+	'''
+	recalls = {}
+	for routine, marks in scores.items():
+		count = 0
+		for judge, mark in marks.items():
+			if mark and mark not in ('0', '-') and judge != head_judge:
+				count += 1
+		recalls[routine] = count
+	return recalls
 
-## TODO: size
 def prelims(scores, head_judge, size):
-	''' Returns the results of a preliminary scoring.
+	''' Returns the results of a preliminary (callback) round
+
+	The recalls of every routine are counted in one pass and the top `size` are
+	found with a heap, so only the couples near the top are ever sorted. Couples
+	on the cut line with the same number of recalls as the last place through
+	are all returned as tied when there is not room for all of them, so the
+	chairman can decide whether to recall more or fewer couples.
 
 	Parameters
 	----------
 	scores: dict
-	a dictionary of {routine: placements} where placements is
-	another dictionary of {judge: placement" pairs
+	a dictionary of {routine: marks} where marks is another dictionary of
+	{judge: mark} pairs, a mark being an 'X' or 1 for a recall
 
 	head_judge: hashable
-	the head judge in the competition
+	the head judge in the competition, who does not mark the callbacks
 
 	size: int
 	the number of competitors are advancing
 
 	Returns
 	-------
+	tuple : list, list
+	the (routine, recalls) pairs that are recalled and those tied on the cut
+	line for the remaining places, each with the most recalls first
 
-	dict
-	a list of top placements
 	'''
-	num_judges = len(scores.itervalues().next())
-	placements = []
+	recalls = count_recalls(scores, head_judge)
+	if size <= 0: return [], []
+	if size >= len(recalls):
+		cut = min(recalls.values()) if recalls else 0
+	else:
+		cut = heapq.nlargest(size, recalls.itervalues())[-1]
+	recalled = [(r, c) for r, c in recalls.items() if c > cut]
+	tied     = [(r, c) for r, c in recalls.items() if c == cut]
+	if len(recalled) + len(tied) <= size:
+		recalled, tied = recalled + tied, []
+	recalled.sort(key=lambda pair: -pair[1])
+	return recalled, tied
+
+def place_routines(routines, tallies, sums, majority, num_places, head_mark,
+                   used=None, profile=None):
+	''' Places routines from their cumulative tally and sum tables
+
+	Routines are ranked on the first column in which they reach a majority, and
+	the routines that reach it in the same column are split with
+	`resolve_ties`.
+
+	Parameters
+	----------
+	routines: iterable
+	the routines to place
+
+	tallies: dict
+	the {routine: tallies} table, indexed by placement (see `tally_table`)
 
-	for r in scores:
-		tuple = (r, scores[r], sum_placements(scores, r, 3, head_judge))
-		placements.append(tuple)
-	return sorted(placements, key=operator.itemgetter(2))
+	sums: dict
+	the {routine: sums} table, indexed by placement
+
+	majority: int
+	the tally needed for a majority
+
+	num_places: int
+	the number of placements
+
+	head_mark: function
+	`head_mark(routine)` gives the head judge's mark for the routine
+
+	used: dict, optional
+	if given, it is filled with the {routine: column} of the last column each
+	routine's placement looked at
+
+	profile: instrument.Profile, optional
+	if given, the time spent on every step is recorded in it
+
+	Returns
+	-------
+	dict
+	the {place: routine} placements
 
-def competition(scores, head_judge, included=True):
+	'''
+	if used is None: used = {}
+	if profile is not None: profile.start('majority')
+	columns = {}
+	for routine in routines:
+		column = bisect.bisect_left(tallies[routine], majority, 1)
+		columns.setdefault(column, []).append(routine)
+		used[routine] = column
+	if profile is not None:
+		profile.count('majority', len(used))
+		profile.stop('majority')
+	def look(table):
+		def cell(routine, column):
+			if column > used[routine]: used[routine] = column
+			return table[routine][column]
+		return cell
+	placements = dict((place, None) for place in range(1, num_places+1))
+	place = 1
+	for column in sorted(columns):
+		group = columns[column]
+		if len(group) == 1:
+			placements[place] = group[0]
+		else:
+			for placement, routine in resolve_ties(group, place, column,
+			                                       look(tallies), look(sums),
+			                                       head_mark, num_places, profile):
+				placements[placement] = routine
+		place += len(group)
+	return placements
+
+def competition(scores, head_judge, included=True, compact=False, profile=None):
 	''' places routines using the relative placement method
 
 	The basic idea behind this method is to place routines based on the relative
@@ -177,11 +433,12 @@ def competition(scores, head_judge, included=True):
 
 	Parameters
 	----------
-	scores: dictionary
+	scores: dictionary or ScoreSheet
 	Scores is a dictionary of routine names or numbers or ids or objects,
 	however you care to implement routines, so long as they are hashable. In
 	this implementation it is favorable to have them as either strings or ints
-	as those are more compact.
+	as those are more compact. A dictionary is turned into a `ScoreSheet`
+	first, and a `ScoreSheet` is used as it is.
 
 	head_judge: judge Object
 	This is a judge object and must be hashable. It is our index into the scores
@@ -193,6 +450,15 @@ def competition(scores, head_judge, included=True):
 	process. This is not required, as most of the time we do include the head
 	judge's scores in the tallying process
 
+	compact: boolean, optional
+	If this is set the reasons are returned as a `reasons.CompactReasons`, which
+	only stores the columns each placement used but can be read just like the
+	usual dictionary. This is worth it for large fields
+
+	profile: instrument.Profile, optional
+	If this is given the time spent on every step, the number of tie groups and
+	the table cells looked at are recorded in it
+
 	Returns
 	-------
 	dictionary
@@ -206,87 +472,220 @@ def competition(scores, head_judge, included=True):
 	more to come... maybe
 
 	'''
-	num_judges   = len(scores.itervalues().next())
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	num_judges   = len(scores.judges)
 	num_routines = len(scores)
 	majority     = (num_judges+1) / 2
-	print 'Majority', majority
-	placements   = {} # A dictionary to hold the placements
 	reasons      = {} # A dictionary to hold the reasons for each placement
-	ties         = {} # A dictionary to hold the ties we need to process
+	used         = {} # The last column each placement looked at
 
 	## Step 1: tally/sum scores
-	for place in range(1,num_routines+1): placements[place] = None
+	if profile is not None: profile.start('tally')
+	tallies, sums = tally_table(scores, num_routines,
+	                            None if included else head_judge)
+	if profile is not None:
+		profile.count('tally', num_routines*num_routines)
+		profile.stop('tally')
+
+	## Step 2-4: majority placements, then the ties
+	placements = place_routines(scores, tallies, sums, majority, num_routines,
+	                            lambda r: scores.mark(r, head_judge), used,
+	                            profile)
+
+	if compact:
+		reasons = CompactReasons(scores, used, tallies, sums,
+		                         None if included else head_judge)
+		return placements, reasons
 	for routine in scores:
+		tally, sum = tallies[routine], sums[routine]
 		reasons[routine] = {}
 		for place in range(1,num_routines+1):
-			if included:
-				reasons[routine][place] = {
-				'tally': count_placements(scores, routine, place),
-				'sum'  : sum_placements(  scores, routine, place)
-				}
-			else:
-				reasons[routine][place] = {
-				'tally': count_placements(scores, routine, place, head_judge),
-				'sum'  : sum_placements(  scores, routine, place, head_judge)
-				}
-
-	## Step 2: initial placments
-	decided_placements = {}
-	decided_routines   = []
-	current_placement  = 1
-	for place in range(1,num_routines+1):
-		decided_placements[place] = {'count':0, 'routines':[]}
+			reasons[routine][place] = {'tally': tally[place], 'sum': sum[place]}
+
+	return placements, reasons
+
+def dual_tally_table(scores, num_places, head_judge):
+	''' Builds the tally and sum tables both with and without the head judge
+
+	One pass is made over the marks. The head judge is found by their index in
+	the sheet's judges (a mask on the column, not an identity test on every
+	mark), their mark is kept to one side, and the tables without them are the
+	full tables less that one mark from its column onwards.
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the scores over which we are counting
+
+	num_places: int
+	the number of placement columns to build
+
+	head_judge: hashable
+	the head judge
+
+	Returns
+	-------
+	tuple : tuple, tuple
+	the (tallies, sums) tables including the head judge's marks and the
+	(tallies, sums) tables without them, each as returned by `tally_table`
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	num_judges = len(scores.judges)
+	head       = scores.judge_index.get(head_judge, -1)
+	tallies, sums = {}, {}
+	tallies_without, sums_without = {}, {}
+	for r, routine in enumerate(scores.routines):
+		row   = scores.marks[r*num_judges:(r+1)*num_judges]
+		tally = [0]*(num_places+1)
+		sum   = [0]*(num_places+1)
+		for mark in row:
+			if 0 < mark <= num_places:
+				tally[mark] += 1
+				sum[mark]   += mark
+		for place in range(1, num_places+1):
+			tally[place] += tally[place-1]
+			sum[place]   += sum[place-1]
+		tallies[routine], sums[routine] = tally, sum
+		## take the head judge's one mark back out
+		mark = row[head] if head >= 0 else 0
+		if 0 < mark <= num_places:
+			tally = tally[:mark] + [t-1    for t in tally[mark:]]
+			sum   = sum[:mark]   + [s-mark for s in sum[mark:]]
+		tallies_without[routine], sums_without[routine] = tally, sum
+	return (tallies, sums), (tallies_without, sums_without)
+
+def dual_competition(scores, head_judge):
+	''' Places the routines both with and without the head judge's marks
+
+	This gives the same results as calling `competition` with `included` True
+	and then False, but tallies the marks only once (see `dual_tally_table`).
+	Comparing the two placements shows whether the head judge's marks changed
+	the result.
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the scores
+
+	head_judge: hashable
+	the head judge
+
+	Returns
+	-------
+	tuple : tuple, tuple
+	the `placements, reasons` with the head judge's marks included and the
+	`placements, reasons` without them
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	num_routines = len(scores)
+	majority     = (len(scores.judges)+1) / 2
+	head_mark    = lambda r: scores.mark(r, head_judge)
+	results = []
+	for tallies, sums in dual_tally_table(scores, num_routines, head_judge):
+		reasons = {}
 		for routine in scores:
-			tally = reasons[routine][place]['tally']
-			if tally >= majority and routine not in decided_routines:
-				decided_placements[place]['count'] += 1
-				decided_placements[place]['routines'].append(routine)
-				decided_routines.append(routine)
-		if decided_placements[place]['count'] is 1:
-			placements[current_placement] = decided_placements[place]['routines'][0]
-		elif decided_placements[place]['count'] > 1:
-			ties[current_placement] = place
-		current_placement += decided_placements[place]['count']
-
-	## Step 3-4: proccess ties
-	def place_ties(routines, place, count, i):
-		if len(routines) is 0: return
-		if len(routines) is 1:
-			placements[place] = routines[0]
-			return
-		## TODO: fix this
-		if count >= num_routines:
-			headjudgescores = {}
-			for r in routines:
-				headjudgescore = scores[r][head_judge]
-				headjudgescores[headjudgescore] = r
-			print 'head judge', headjudgescores
-			for _,routine in headjudgescores.items():
-				placements[place] = routine
-				place += 1
-			return
-		the_dict     = {r:reasons[r][count][i] for r in routines}
-		new_routines = [min(the_dict, key=the_dict.get)] if i is 'sum' else [max(the_dict, key=the_dict.get)]
-		for r, v in the_dict.items():
-			if v is the_dict[new_routines[0]] and not r is new_routines[0]:
-				new_routines.append(r)
-		if len(new_routines) is 1:
-			placements[place] = new_routines[0]
-			routines.remove(new_routines[0])
-			place_ties(routines, place+1, count, 'sum')
-			return
+			tally, sum = tallies[routine], sums[routine]
+			reasons[routine] = dict((place, {'tally': tally[place], 'sum': sum[place]})
+			                        for place in range(1, num_routines+1))
+		placements = place_routines(scores, tallies, sums, majority, num_routines,
+		                            head_mark)
+		results.append((placements, reasons))
+	return tuple(results)
+
+def lazy_competition(scores, head_judge, included=True):
+	''' places routines like `competition`, but only works out what it needs
+
+	`competition` fills in the tally and sum of every routine at every placement
+	before it places anyone. Most of those cells are never looked at: once a
+	routine reaches a majority it is placed, and sums are only needed to break
+	ties. This version sorts each routine's marks once, which gives its majority
+	column straight away (the column of its majority-th best mark), and then
+	works out a tally (with a binary search) or a sum (from a running total of
+	the sorted marks) only when a tie asks for it.
+
+	Parameters
+	----------
+	scores: dictionary or ScoreSheet
+	the {routine: {judge: placement}} scores
+
+	head_judge: judge Object
+	the head judge, who breaks the final ties
+
+	included: boolean, optional
+	whether the head judge's marks are tallied
+
+	Returns
+	-------
+	tuple : dict, dict, int
+	the {place: routine} placements, the reasons table holding only the cells
+	that were worked out (a routine's row stops at the column where it was
+	placed, and 'sum' is only there when a tie needed it) and the number of
+	tallies and sums that were worked out
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	num_judges   = len(scores.judges)
+	num_routines = len(scores)
+	majority     = (num_judges+1) / 2
+	head         = -1 if included else scores.judge_index.get(head_judge, -1)
+	placements   = dict((place, None) for place in range(1, num_routines+1))
+	reasons      = dict((routine, {}) for routine in scores)
+	evaluated    = [0]
+
+	## every routine's marks in order, with their running totals
+	marks   = {}
+	running = {}
+	for routine in scores:
+		marks[routine] = sorted(mark for j, mark in enumerate(scores.row(routine))
+		                        if j != head and 0 < mark <= num_routines)
+		running[routine] = [0]
+		for mark in marks[routine]:
+			running[routine].append(running[routine][-1] + mark)
+
+	def cell(routine, place, i):
+		column = reasons[routine].setdefault(place, {})
+		if i not in column:
+			tally = bisect.bisect_right(marks[routine], place)
+			column[i] = tally if i == 'tally' else running[routine][tally]
+			evaluated[0] += 1
+		return column[i]
+
+	## Step 1-2: the majority-th best mark is the column a routine reaches a
+	## majority in, so the routines are ordered on it without tallying
+	## anything else (past the last column if it never does)
+	def majority_column(routine):
+		if len(marks[routine]) < majority: return num_routines+1
+		place = marks[routine][majority-1]
+		cell(routine, place, 'tally')
+		return place
+	columns = sorted(((majority_column(r), r) for r in scores),
+	                 key=lambda pair: pair[0])
+	ties    = []
+	current_placement = 1
+	for place, group in itertools.groupby(columns, key=lambda pair: pair[0]):
+		decided = [routine for _, routine in group]
+		if len(decided) == 1:
+			placements[current_placement] = decided[0]
 		else:
-			place_ties(new_routines[:], place, count+1, 'tally')
-			for r in new_routines: routines.remove(r)
-			place_ties(routines, place+len(new_routines), count, 'sum')
-			return
-		return
+			ties.append((decided, current_placement, place))
+		current_placement += len(decided)
 
-	for current_placement, place in ties.items():
-		routines = decided_placements[place]['routines']
-		place_ties(routines[:], current_placement, place, 'sum')
+	## Step 3-4: break the ties, working out sums only as they are needed
+	tally     = lambda r, place: cell(r, place, 'tally')
+	sum       = lambda r, place: cell(r, place, 'sum')
+	head_mark = lambda r: scores.mark(r, head_judge)
+	for routines, current_placement, place in ties:
+		for placement, routine in resolve_ties(routines, current_placement, place,
+		                                       tally, sum, head_mark, num_routines):
+			placements[placement] = routine
 
-	return placements, reasons
+	return placements, reasons, evaluated[0]
 
 
 ## Alias functions to make things look nicer later on
@@ -295,8 +694,9 @@ simi_finals    = prelims
 finals         = competition
 
 if __name__ == '__main__':
-	import pprint, argparse
-	from input_output import print_full_placements, parse_input_file, read_csv
+	import pprint, argparse, sys
+	from input_output import print_full_placements, parse_input_file, read_csv_files
+	from input_output import export_placements, read_score_files
 	
 	pp = pprint.PrettyPrinter(indent=4)
 
@@ -305,16 +705,65 @@ if __name__ == '__main__':
 	                    help='use the given file as input')
 	parser.add_argument('--files',  nargs='*', type=argparse.FileType('r'),
 	                    help='use multiple files as input')
-	parser.add_argument('--scores', nargs='*', type=argparse.FileType('r'),
-	                    help='use multiple score files as input')
-	parser.add_argument('--output', nargs='?', type=argparse.FileType('r'),
-	                    help='output file for the program')
+	parser.add_argument('--scores', nargs='*', type=str,
+	                    help='use multiple score files as input, opened and '
+	                         'read on --workers threads')
+	parser.add_argument('--output', nargs='?', type=argparse.FileType('w'),
+	                    default=sys.stdout, help='output file for the program')
+	parser.add_argument('--export', choices=['csv', 'jsonl', 'wide'],
+	                    help='write the placements and cells in this format')
+	parser.add_argument('--table',  choices=['text', 'markdown', 'html'],
+	                    default='text', help='the format of the printed table')
 	parser.add_argument('--pprint', action='store_true',
 	                    help='pretty prints the output to stdout')
 	parser.add_argument('--csv',    nargs='*', type=argparse.FileType('r'),
 						help='read in multiple csv files')
+	parser.add_argument('--workers', type=int, default=None,
+	                    help='number of processes used to score --files, or '
+	                         'threads used to read --scores')
+	parser.add_argument('--profile', action='store_true',
+	                    help='time the steps of the placement, to stderr')
+	parser.add_argument('--serve',   action='store_true',
+	                    help='score JSON Lines jobs from stdin (see service.py)')
+	parser.add_argument('--batch-size', type=int, default=64,
+	                    help='the most --serve jobs scored together')
 	args = parser.parse_args()
-	scores = parse_input_file(args.file)
-	pprint.pprint(scores)
-	placements, reasons = competition(scores, '3', True)
-	print_full_placements(scores, placements, reasons)
+	if args.serve:
+		from service import serve
+		serve(sys.stdin, args.output, args.batch_size)
+	elif args.files or args.csv:
+		from parallel import score_program
+		if args.files:
+			events = [parse_input_file(file) for file in args.files]
+		else:
+			events = [sheet for _, sheet in read_csv_files(args.csv)]
+		results = score_program([(scores, '3', True) for scores in events],
+		                        args.workers)
+		for scores, (placements, reasons) in zip(events, results):
+			if args.export:
+				export_placements(scores, placements, reasons, args.output,
+				                  args.export)
+			else:
+				print_full_placements(scores, placements, reasons, args.output,
+				                      args.table)
+	else:
+		if args.scores:
+			scores, latency = read_score_files(args.scores, args.workers or 8)
+		else:
+			scores, latency = parse_input_file(args.file), []
+		if not args.export and args.table == 'text':
+			pprint.pprint(scores, args.output)
+		profile = None
+		if args.profile:
+			from instrument import Profile
+			profile = Profile()
+		placements, reasons = competition(scores, '3', True, profile=profile)
+		if args.export:
+			export_placements(scores, placements, reasons, args.output, args.export)
+		else:
+			print_full_placements(scores, placements, reasons, args.output,
+			                      args.table)
+		if profile is not None:
+			profile.report(sys.stderr)
+			for name, seconds in latency:
+				sys.stderr.write('%-40s %11.6f\n' % (name, seconds))
@@ -0,0 +1,173 @@
+''' how close were two couples? the flip distance of adjacent placements
+
+For an appeal the question is usually how close the couples placed k-th and
+(k+1)-th were. `sensitivity` answers it with the flip distance of every adjacent
+pair: the smallest number of judges who would have had to mark the two couples
+the other way round for the lower couple to finish above the upper one (other
+couples can move too, so the two don't have to end up in each other's places)
+
+    >>> for place, upper, lower, distance, judges in sensitivity(scores, '3'):
+    ...     print place, upper, lower, distance, judges
+    1 340278 274283 1 ('5',)
+    2 274283 318273 2 ('1', '4')
+    ...
+
+A mark change here is one judge swapping the marks they gave the two couples,
+so every judge's marks are still a valid ranking and no other couple's marks
+move. Only the judges that marked the upper couple ahead of the lower one can
+help, so those are the only ones tried.
+
+The search does not re-score the event for every change. A swap only touches
+the two couples' rows of the cumulative tally and sum tables, and what it does
+to them depends only on the two marks swapped, so the rows are patched in
+place and the field is placed again from the tables. Sets of judges with the
+same pairs of marks give the same tables and are only tried once, and the sets
+are tried smallest first so the first one that swaps the couples is the
+answer. That answer is checked by scoring the changed marks again from scratch
+with `scoring.competition` before it is returned.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import itertools
+from array import array
+
+from scoring     import competition, tally_table, place_routines
+from score_sheet import ScoreSheet
+
+
+def _swap_rows(tally, sum, better, worse, sign):
+	''' Patches a routine's tables for its mark moving from `better` to `worse`
+	(sign 1), or from `worse` to `better` (sign -1) '''
+	for place in range(better, worse):
+		tally[place] -= sign
+		sum[place]   -= sign*better
+	for place in range(worse, len(tally)):
+		sum[place] += sign*(worse - better)
+
+def flip_distance(scores, head_judge, upper, lower, included=True, max_changes=None):
+	''' The fewest judges that would have to swap two couples to turn them round
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the {routine: {judge: placement}} scores
+
+	head_judge: hashable
+	the head judge
+
+	upper: hashable
+	the routine that placed higher
+
+	lower: hashable
+	the routine that placed lower
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	max_changes: int, optional
+	give up after trying this many judges at once
+
+	Returns
+	-------
+	tuple : int, tuple
+	the number of judges and the judges themselves, or (None, ()) if no set of
+	judges swapping the couples would put the lower couple above the upper one
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	num_routines = len(scores)
+	majority     = (len(scores.judges)+1) / 2
+	excluded     = None if included else head_judge
+	tallies, sums = tally_table(scores, num_routines, excluded)
+	## the judges that had the upper couple ahead, with the marks they gave
+	judges = [(judge, scores.mark(upper, judge), scores.mark(lower, judge))
+	          for judge in scores.judges]
+	judges = [(judge, u, l) for judge, u, l in judges if 0 < u < l]
+	if max_changes is None: max_changes = len(judges)
+	tried = set()
+	for size in range(1, min(max_changes, len(judges))+1):
+		for subset in itertools.combinations(judges, size):
+			key = tuple(sorted((u, l, judge == head_judge) for judge, u, l in subset))
+			if key in tried: continue
+			tried.add(key)
+			## patch only the two couples' rows
+			table = dict(tallies)
+			total = dict(sums)
+			for routine in (upper, lower):
+				table[routine] = list(tallies[routine])
+				total[routine] = list(sums[routine])
+			head = {}
+			for judge, u, l in subset:
+				if judge == head_judge:
+					head = {upper: l, lower: u}
+					if not included: continue
+				_swap_rows(table[upper], total[upper], u, l,  1)
+				_swap_rows(table[lower], total[lower], u, l, -1)
+			head_mark = lambda r: head.get(r) or scores.mark(r, head_judge)
+			flipped = place_routines(scores, table, total, majority, num_routines,
+			                         head_mark)
+			flipped = dict((routine, place) for place, routine in flipped.items())
+			if flipped[lower] < flipped[upper]:
+				changed = tuple(judge for judge, _, _ in subset)
+				if not _rescored_flip(scores, head_judge, included, upper, lower,
+				                      changed):
+					raise AssertionError('the patched tables and a full rescore '
+					                     'disagree for judges %r' % (changed,))
+				return size, changed
+	return None, ()
+
+def _rescored_flip(scores, head_judge, included, upper, lower, judges):
+	''' Scores the marks again from scratch with the two couples swapped by
+	`judges`, and tells whether the lower couple then places above the upper '''
+	changed = ScoreSheet(scores.routines, scores.judges, array('H', scores.marks))
+	for judge in judges:
+		u, l = scores.mark(upper, judge), scores.mark(lower, judge)
+		changed.set_mark(upper, judge, l)
+		changed.set_mark(lower, judge, u)
+	placements, _ = competition(changed, head_judge, included)
+	places = dict((routine, place) for place, routine in placements.items())
+	return places[lower] < places[upper]
+
+def sensitivity(scores, head_judge, included=True, max_changes=None):
+	''' The flip distance of every pair of adjacent placements
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the {routine: {judge: placement}} scores
+
+	head_judge: hashable
+	the head judge
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	max_changes: int, optional
+	the most judges tried at once for each pair
+
+	Returns
+	-------
+	list
+	(place, upper, lower, distance, judges) for every place from 1st down,
+	where distance is None if the pair cannot be swapped this way
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	num_routines = len(scores)
+	tallies, sums = tally_table(scores, num_routines,
+	                            None if included else head_judge)
+	placements = place_routines(scores, tallies, sums,
+	                            (len(scores.judges)+1) / 2, num_routines,
+	                            lambda r: scores.mark(r, head_judge))
+	results = []
+	for place in range(1, num_routines):
+		upper, lower = placements[place], placements[place+1]
+		if upper is None or lower is None: continue
+		distance, judges = flip_distance(scores, head_judge, upper, lower,
+		                                 included, max_changes)
+		results.append((place, upper, lower, distance, judges))
+	return results
@@ -0,0 +1,213 @@
+''' a JSON Lines batch scoring service
+
+Event software can pipe any number of scoring jobs through one running process
+instead of starting Python for every event
+
+    >>> python scoring.py --serve < jobs.jsonl > results.jsonl
+
+Every line of the input is one job
+
+    {"id": "W-final", "marks": {"274283": {"1": 2, "2": 1, ...}, ...},
+     "head_judge": "3", "included": true, "round": "final"}
+
+where `round` is "final" (the default) or "prelims", "quarter_finals" or
+"simi_finals", which also need the "size" of the callback. Every job gets one
+line of output, in the same order as the input
+
+    {"id": "W-final", "placements": {"1": "340278", "2": "274283", ...}}
+    {"id": "W-semi", "recalled": [["274283", 5], ...], "tied": []}
+    {"id": "bad", "error": "..."}
+
+A job with `"reasons": true` also gets the reasons table of
+`scoring.competition`. Finals are collected into micro-batches and each batch is
+placed in one call to the vectorized `batch` engine; the results of a batch are
+written out as soon as it is done, and a batch that isn't full is written out
+as soon as no more input is waiting, so the output keeps up with the input. A
+job that can't be scored only gets an error line, the rest of its batch is
+scored as usual.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import json
+import select
+import sys
+
+import numpy as np
+
+from batch   import stack_scores, batch_competition, unstack_placements
+from scoring import competition, prelims
+
+ROUNDS = ('final', 'prelims', 'quarter_finals', 'simi_finals')
+
+
+def _error(job, error):
+	return {'id': job.get('id') if isinstance(job, dict) else None,
+	        'error': str(error)}
+
+def _score_finals(jobs):
+	''' Places a micro-batch of finals with the batch engine '''
+	marks, routines, _, heads = stack_scores([job['marks'] for job in jobs],
+	                                         [job.get('head_judge') for job in jobs])
+	included = np.array([bool(job.get('included', True)) for job in jobs])
+	places   = batch_competition(marks, heads, included)
+	return unstack_placements(places, routines)
+
+def _score_each(jobs):
+	''' Places finals one at a time, for a batch the engine couldn't place in
+	one go, so that only the jobs that fail get an error '''
+	results = []
+	for job in jobs:
+		try:
+			results.append(_result(job, _score_finals([job])[0]))
+		except Exception as error:
+			results.append(_error(job, '%s: %s' % (type(error).__name__, error)))
+	return results
+
+def _result(job, placements=None):
+	''' The output line of a job '''
+	result = {'id': job.get('id')}
+	head_judge, included = job.get('head_judge'), job.get('included', True)
+	if job.get('round', 'final') != 'final':
+		recalled, tied = prelims(job['marks'], head_judge, job['size'])
+		result['recalled'], result['tied'] = recalled, tied
+	elif job.get('reasons'):
+		placements, reasons = competition(job['marks'], head_judge, included)
+		result['placements'], result['reasons'] = placements, reasons
+	else:
+		result['placements'] = placements
+	return result
+
+def _check(job):
+	''' Raises ValueError if a job can't be scored '''
+	if not isinstance(job, dict):
+		raise ValueError('a job must be a JSON object')
+	if not isinstance(job.get('marks'), dict) or not job['marks']:
+		raise ValueError('a job needs its "marks"')
+	if job.get('round', 'final') not in ROUNDS:
+		raise ValueError('unknown round %r' % job.get('round'))
+	if job.get('round', 'final') != 'final' and not isinstance(job.get('size'), int):
+		raise ValueError('a callback round needs its "size"')
+	## a final is marked with places, a callback with 'X' (or 1) for a recall
+	final  = job.get('round', 'final') == 'final'
+	judges = None
+	for routine, marks in job['marks'].items():
+		if not isinstance(marks, dict) or not marks:
+			raise ValueError('the marks of routine %s must be a {judge: mark} object'
+			                 % routine)
+		for mark in marks.values():
+			if final and (isinstance(mark, bool) or not isinstance(mark, int) or
+			              mark < 0):
+				raise ValueError('routine %s has a mark that is not a place: %r'
+				                 % (routine, mark))
+			if not final and not isinstance(mark, (int, basestring)):
+				raise ValueError('routine %s has a mark that is not a recall: %r'
+				                 % (routine, mark))
+		if judges is None: judges = len(marks)
+		elif len(marks) != judges:
+			raise ValueError('routine %s has %d marks, the first routine has %d'
+			                 % (routine, len(marks), judges))
+
+def score_jobs(jobs):
+	''' Scores a micro-batch of jobs
+
+	Parameters
+	----------
+	jobs: list
+	the decoded jobs, or the ValueError of a line that could not be decoded
+
+	Returns
+	-------
+	list
+	the result of every job, in the same order
+
+	'''
+	results = [None]*len(jobs)
+	finals  = []
+	for i, job in enumerate(jobs):
+		try:
+			if isinstance(job, ValueError): raise job
+			_check(job)
+		except ValueError as error:
+			results[i] = _error(job, error)
+			continue
+		if job.get('round', 'final') == 'final' and not job.get('reasons'):
+			finals.append(i)
+			continue
+		try:
+			results[i] = _result(job)
+		except Exception as error:
+			results[i] = _error(job, '%s: %s' % (type(error).__name__, error))
+	if finals:
+		batch = [jobs[i] for i in finals]
+		try:
+			scored = [_result(job, placements) for job, placements in
+			          zip(batch, _score_finals(batch))]
+		except Exception:
+			## find the jobs that fail rather than failing the whole batch
+			scored = _score_each(batch)
+		for i, result in zip(finals, scored):
+			results[i] = result
+	return results
+
+def _waiting(input, wait):
+	''' Whether more input arrives within `wait` seconds. Input that isn't a
+	real file, such as a StringIO, is always all there '''
+	try:
+		fileno = input.fileno()
+	except (AttributeError, IOError, OSError, ValueError):
+		return True
+	try:
+		ready, _, _ = select.select([fileno], [], [], wait)
+	except (select.error, IOError, OSError, ValueError):
+		return False
+	return bool(ready)
+
+def serve(input=None, output=None, batch_size=64, wait=0.01):
+	''' Scores the JSON Lines jobs of `input`, writing the results to `output`
+
+	Parameters
+	----------
+	input: file, optional
+	the jobs, one JSON object per line. Defaults to stdin
+
+	output: file, optional
+	where the results go, one JSON object per line. Defaults to stdout
+
+	batch_size: int, optional
+	the most jobs scored together
+
+	wait: float, optional
+	how long, in seconds, to wait for more jobs before a batch that isn't full
+	is scored and written out
+
+	Returns
+	-------
+	int
+	the number of jobs scored
+
+	'''
+	if input  is None: input  = sys.stdin
+	if output is None: output = sys.stdout
+	count = 0
+	batch = []
+	## readline rather than iterating, so a job is read as soon as it arrives
+	for line in iter(input.readline, ''):
+		if not line.strip(): continue
+		try:
+			batch.append(json.loads(line))
+		except ValueError as error:
+			batch.append(ValueError('bad JSON: %s' % error))
+		if len(batch) >= batch_size or not _waiting(input, wait):
+			count += _flush(batch, output)
+			batch  = []
+	if batch:
+		count += _flush(batch, output)
+	return count
+
+def _flush(batch, output):
+	for result in score_jobs(batch):
+		output.write(json.dumps(result, sort_keys=True) + '\n')
+	output.flush()
+	return len(batch)
@@ -0,0 +1,197 @@
+''' Monte Carlo simulation of judge variance
+
+How stable was a result? `simulate` answers that by judging the final again many
+times over. In every trial each judge's marks are perturbed by a noise model and
+re-ranked, so every trial is still a valid set of ordinal marks, and the field is
+placed again with the relative placement rules. The outcome is every couple's
+distribution of final places
+
+    >>> distribution = simulate(scores, '3', trials=100000, noise=0.75, seed=1)
+    >>> distribution['274283']
+    array([0.    , 0.8125, 0.1731, 0.0144, ...])  # P(1st), P(2nd), ...
+
+The trials are never looped over in Python. The marks of a block of trials are
+stacked into one (trials x routines x judges) array and placed in one call to
+`batch.batch_competition`, which treats every trial as an event.
+
+A noise model is a function `noise(marks, rng)` that takes the (trials x routines
+x judges) array of marks and returns an array of the same shape of "what the
+judge saw" scores, lower being better. `gaussian_noise` and `uniform_noise` are
+provided, and a plain number is taken as the sigma of `gaussian_noise`.
+'''
+
+__author__  = 'Brooks MacBeth'
+__version__ = '1.0.0'
+
+import sys
+
+import numpy as np
+
+from batch       import batch_competition
+from score_sheet import ScoreSheet
+
+
+def gaussian_noise(sigma):
+	''' Noise model that adds normal noise to every mark
+
+	Parameters
+	----------
+	sigma: float or list
+	the standard deviation of the noise, in places. A list gives every judge
+	their own sigma, in the order of the judges of the sheet
+
+	'''
+	sigma = np.asarray(sigma, dtype=float)
+	def noise(marks, rng):
+		return marks + sigma*rng.standard_normal(marks.shape)
+	return noise
+
+def uniform_noise(width):
+	''' Noise model that adds uniform noise in [-width, width] to every mark
+
+	Parameters
+	----------
+	width: float or list
+	the most a mark can move, in places, for all judges or per judge
+
+	'''
+	width = np.asarray(width, dtype=float)
+	def noise(marks, rng):
+		return marks + width*rng.uniform(-1, 1, marks.shape)
+	return noise
+
+def perturb_marks(marks, trials, noise, rng):
+	''' Makes `trials` noisy copies of a sheet of marks
+
+	Parameters
+	----------
+	marks: ndarray
+	the (routines x judges) marks
+
+	trials: int
+	the number of copies
+
+	noise: function
+	the noise model, see the module documentation
+
+	rng: numpy.random.RandomState
+	the random numbers
+
+	Returns
+	-------
+	ndarray
+	the (trials x routines x judges) marks, where every judge's marks have been
+	re-ranked after the noise so they are still places 1..N. Missing (0) marks
+	stay missing
+
+	'''
+	marks  = np.asarray(marks)
+	given  = marks > 0
+	seen   = noise(np.broadcast_to(marks, (trials,) + marks.shape).astype(float), rng)
+	seen   = np.where(given, seen, np.inf)
+	## a double argsort ranks every judge's column of every trial
+	ranked = np.argsort(np.argsort(seen, axis=1, kind='mergesort'), axis=1) + 1
+	return np.where(given, ranked, 0).astype(np.uint16)
+
+def simulate(scores, head_judge, trials=10000, noise=0.5, included=True,
+             seed=None, block=10000):
+	''' Judges the event again `trials` times with noisy judges
+
+	Parameters
+	----------
+	scores: dict or ScoreSheet
+	the {routine: {judge: placement}} scores
+
+	head_judge: hashable
+	the head judge
+
+	trials: int, optional
+	the number of times to judge the event again
+
+	noise: float or function, optional
+	the noise model, or the sigma of `gaussian_noise`
+
+	included: bool, optional
+	whether the head judge's marks are tallied
+
+	seed: int, optional
+	the seed for the random numbers, for results that can be reproduced
+
+	block: int, optional
+	the number of trials placed in one batch; this bounds the memory used
+
+	Returns
+	-------
+	dict
+	{routine: probabilities} where probabilities is an array indexed by
+	placement (index 0 is always 0) of the fraction of trials the routine
+	finished in that place
+
+	'''
+	if not isinstance(scores, ScoreSheet):
+		scores = ScoreSheet.from_dict(scores)
+	if not callable(noise):
+		noise = gaussian_noise(noise)
+	rng    = np.random.RandomState(seed)
+	marks  = scores.as_array()
+	R      = len(scores)
+	head   = scores.judge_index.get(head_judge, -1)
+	counts = np.zeros((R, R+1), dtype=np.int64)
+	done   = 0
+	while done < trials:
+		size  = min(block, trials - done)
+		noisy = perturb_marks(marks, size, noise, rng)
+		heads = np.full(size, head, dtype=np.intp)
+		places = batch_competition(noisy, heads, included)
+		## one histogram for every (routine, place) pair of the block
+		cells  = (np.arange(R)*(R+1) + places).ravel()
+		counts += np.bincount(cells, minlength=R*(R+1)).reshape(R, R+1)
+		done  += size
+	probabilities = counts / float(max(trials, 1))
+	return dict((routine, probabilities[r]) for r, routine in enumerate(scores.routines))
+
+def report(distribution, placements=None, file=sys.stdout):
+	''' Writes out every routine's distribution of places as a table
+
+	Parameters
+	----------
+	distribution: dict
+	the result of `simulate`
+
+	placements: dict, optional
+	the actual {place: routine} placements; routines are listed in this order
+	when it is given
+
+	'''
+	routines = sorted(distribution)
+	if placements:
+		routines = [placements[place] for place in sorted(placements)
+		            if placements[place] is not None]
+	num_places = len(routines)
+	file.write('%-14s' % 'Routine' +
+	           ''.join('%7d' % place for place in range(1, num_places+1)) + '\n')
+	for routine in routines:
+		file.write('%-14s' % routine + ''.join('%7.3f' % p
+		           for p in distribution[routine][1:num_places+1]) + '\n')
+
+if __name__ == '__main__':
+	import argparse
+	from input_output import parse_input_file
+	from scoring      import competition
+
+	parser = argparse.ArgumentParser(description='simulate noisy judges')
+	parser.add_argument('file',   type=argparse.FileType('r'),
+	                    help='the score file')
+	parser.add_argument('--head', default='3', help='the head judge')
+	parser.add_argument('--trials', type=int,   default=10000,
+	                    help='the number of trials')
+	parser.add_argument('--sigma',  type=float, default=0.5,
+	                    help='the sigma of the noise, in places')
+	parser.add_argument('--seed',   type=int,   default=None,
+	                    help='the seed for the random numbers')
+	args = parser.parse_args()
+
+	scores = ScoreSheet.from_dict(parse_input_file(args.file))
+	placements, _ = competition(scores, args.head)
+	report(simulate(scores, args.head, args.trials, args.sigma, seed=args.seed),
+	       placements)